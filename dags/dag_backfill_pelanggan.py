@@ -0,0 +1,60 @@
+from airflow import DAG
+from airflow.operators.python import PythonOperator
+from airflow.operators.empty import EmptyOperator
+from datetime import datetime, timedelta
+import sys
+import os
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'scripts'))
+
+from backfill import run_plan_backfill, run_backfill_partition
+
+default_args = {
+    'owner': 'data_engineer',
+    'depends_on_past': False,
+    'start_date': datetime(2025, 10, 17),
+    'email': ['data-engineer@transjakarta.co.id'],
+    'email_on_failure': True,
+    'email_on_retry': False,
+    'retries': 2,
+    'retry_delay': timedelta(minutes=5),
+}
+
+dag = DAG(
+    'transjakarta_pelanggan_backfill',
+    default_args=default_args,
+    description='Backfill paralel per tanggal untuk data pelanggan Transjakarta',
+    schedule_interval=None,  # Hanya dijalankan manual
+    catchup=False,
+    max_active_tasks=8,
+    params={
+        'start_date': None,  # YYYY-MM-DD, default tanggal transaksi paling awal
+        'end_date': None,  # YYYY-MM-DD, default tanggal transaksi paling akhir
+    },
+    tags=['transjakarta', 'etl', 'pelanggan', 'backfill'],
+)
+
+start_task = EmptyOperator(
+    task_id='start',
+    dag=dag,
+)
+
+plan_task = PythonOperator(
+    task_id='plan_partitions',
+    python_callable=run_plan_backfill,
+    dag=dag,
+)
+
+# Satu mapped task per tanggal, dijalankan paralel oleh worker Airflow
+partition_task = PythonOperator.partial(
+    task_id='process_partition',
+    python_callable=run_backfill_partition,
+    dag=dag,
+).expand(op_kwargs=plan_task.output)
+
+end_task = EmptyOperator(
+    task_id='end',
+    dag=dag,
+)
+
+start_task >> plan_task >> partition_task >> end_task
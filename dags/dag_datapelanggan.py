@@ -11,6 +11,7 @@ sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'scripts'))
 from extract import run_extract
 from transform import run_transform
 from load import run_load
+from partitioning import run_partition_maintenance
 
 default_args = {
     'owner': 'data_engineer',
@@ -29,6 +30,22 @@ dag = DAG(
     description='Pipeline ETL untuk data pelanggan Transjakarta',
     schedule_interval='0 7 * * *',  # Setiap hari jam 07:00
     catchup=False,
+    params={
+        'full_refresh': False,  # Set True saat trigger untuk backfill penuh
+        'load_mode': 'replace',  # replace | upsert
+        'transform_mode': 'memory',  # memory | streaming (per chunk, untuk backfill besar)
+        'chunksize': 100000,
+        'aggregation_engine': 'pandas',  # pandas | sql (agregasi dijalankan di PostgreSQL)
+        'max_workers': 1,  # > 1: bus/halte dibaca, dibersihkan, dan diagregasi paralel di thread pool
+        'partition_retention_months': None,  # Partisi transaksi lebih tua dari N bulan di-detach setelah load
+        'partition_drop_detached': False,  # True untuk langsung DROP partisi yang di-detach
+        'diagnostic_logging': False,  # True untuk log isnull/contoh standardisasi/ukuran memory (mahal)
+        'cross_run_dedup': True,  # Buang tap yang uuid-nya sudah dihitung run sebelumnya (table etl_processed_uuid)
+        'dedup_window_days': 35,  # uuid lebih tua dari N hari dilepas dari dedup index oleh maintain_partitions
+        'archive_cleaned': True,  # Simpan frame bersih ke data/archive (Parquet per tanggal) untuk agregasi ulang
+        'archive_retention_months': 13,  # Partisi archive lebih tua dari N bulan dihapus oleh maintain_partitions; None = simpan semua
+        'staging_retention_days': 7,  # Staging run yang gagal (tidak sampai load) dihapus maintain_partitions setelah N hari
+    },
     tags=['transjakarta', 'etl', 'pelanggan'],
 )
 
@@ -58,9 +75,16 @@ load_task = PythonOperator(
     dag=dag,
 )
 
+partition_task = PythonOperator(
+    task_id='maintain_partitions',
+    python_callable=run_partition_maintenance,
+    provide_context=True,
+    dag=dag,
+)
+
 end_task = EmptyOperator(
     task_id='end',
     dag=dag,
 )
 
-start_task >> extract_task >> transform_task >> load_task >> end_task
\ No newline at end of file
+start_task >> extract_task >> transform_task >> load_task >> partition_task >> end_task
\ No newline at end of file
@@ -0,0 +1,147 @@
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import logging
+import os
+import shutil
+import uuid
+from datetime import date
+from typing import Dict, List, Optional, Set
+from schema import CATEGORY_COLUMNS, apply_transaksi_schema
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+ARCHIVE_PATH = '/opt/airflow/data/archive'
+
+# Partisi tanggal yang lebih tua dari N bulan dihapus oleh task maintain_partitions
+ARCHIVE_RETENTION_MONTHS = 13
+
+# zstd: file ~30% lebih kecil dari snappy dengan biaya CPU baca yang masih kecil
+ARCHIVE_COMPRESSION = 'zstd'
+
+# Row group kecil supaya statistik min/max card_type_var cukup selektif untuk dilewati saat filter
+ARCHIVE_ROW_GROUP_SIZE = 64 * 1024
+
+PARTITIONING = ds.partitioning(pa.schema([('tanggal', pa.date32())]), flavor='hive')
+
+
+class CleanedTapArchive:
+    """Dataset Parquet transaksi yang sudah dibersihkan (dedup, no body standar, status 'S'), dipartisi per tanggal.
+
+    Layout: {base_path}/{table_label}/tanggal=YYYY-MM-DD/part-*.parquet. Filter tanggal memangkas direktori,
+    filter card_type memakai statistik row group, dan hanya kolom yang diminta yang dibaca dari disk.
+    """
+
+    def __init__(self, base_path: str = ARCHIVE_PATH, compression: str = ARCHIVE_COMPRESSION):
+        self.base_path = base_path
+        self.compression = compression
+        # Tanggal yang sudah ditulis ulang oleh objek ini; partisi lama hanya dihapus sekali per run
+        self._replaced: Dict[str, Set[date]] = {}
+
+    def _table_path(self, table_label: str) -> str:
+        return os.path.join(self.base_path, table_label)
+
+    def _replace_partitions(self, table_label: str, tanggal_values: List[date]):
+        replaced = self._replaced.setdefault(table_label, set())
+        for tanggal in sorted(set(tanggal_values) - replaced):
+            partition_path = os.path.join(self._table_path(table_label), f'tanggal={tanggal.isoformat()}')
+            if os.path.isdir(partition_path):
+                shutil.rmtree(partition_path)
+            replaced.add(tanggal)
+
+    def write(self, table_label: str, df: pd.DataFrame) -> int:
+        """Tulis frame bersih; tanggal yang sudah ada di archive dari run sebelumnya diganti, bukan ditambah"""
+        # Tap tanpa waktu tidak masuk output mana pun, jadi tidak perlu disimpan untuk agregasi ulang
+        df = df[df['tanggal'].notna()]
+        if df.empty:
+            return 0
+
+        # Urut per tanggal + card type supaya setiap row group hanya mencakup sedikit card type
+        df = df.assign(tanggal=df['tanggal'].dt.date).sort_values(['tanggal', 'card_type_var'])
+        self._replace_partitions(table_label, df['tanggal'].unique().tolist())
+
+        # Category ditulis sebagai string biasa: dictionary Parquet sudah memadatkannya, dan dictionary Arrow
+        # per chunk bisa punya tipe index berbeda yang bentrok saat dataset dibaca
+        df = df.astype({col: 'string[pyarrow]' for col in CATEGORY_COLUMNS if col in df.columns})
+
+        table = pa.Table.from_pandas(df, preserve_index=False)
+        file_format = ds.ParquetFileFormat()
+        ds.write_dataset(
+            table,
+            self._table_path(table_label),
+            format=file_format,
+            partitioning=PARTITIONING,
+            # Nama file unik: chunk berikutnya di mode streaming ditambahkan ke partisi yang sama
+            basename_template=f'part-{uuid.uuid4().hex}-{{i}}.parquet',
+            existing_data_behavior='overwrite_or_ignore',
+            file_options=file_format.make_write_options(compression=self.compression, write_statistics=True),
+            max_rows_per_group=ARCHIVE_ROW_GROUP_SIZE,
+            min_rows_per_group=min(ARCHIVE_ROW_GROUP_SIZE, len(df))
+        )
+        logger.info(f"Archived {len(df)} cleaned rows of {table_label} to {self._table_path(table_label)}")
+        return len(df)
+
+    def prune_before(self, cutoff: date) -> List[str]:
+        """Hapus partisi tanggal sebelum cutoff dari semua table; archive tidak tumbuh sepanjang histori"""
+        removed = []
+        if not os.path.isdir(self.base_path):
+            return removed
+
+        for table_label in sorted(os.listdir(self.base_path)):
+            table_path = self._table_path(table_label)
+            if not os.path.isdir(table_path):
+                continue
+            for partition in sorted(os.listdir(table_path)):
+                # Nama yang bukan tanggal (mis. __HIVE_DEFAULT_PARTITION__) bukan tulisan archive ini, dibiarkan
+                try:
+                    tanggal = date.fromisoformat(partition.split('=', 1)[1]) if partition.startswith('tanggal=') else None
+                except ValueError:
+                    tanggal = None
+                if tanggal is None or tanggal >= cutoff:
+                    continue
+                shutil.rmtree(os.path.join(table_path, partition))
+                removed.append(f'{table_label}/{partition}')
+
+        logger.info(f"Removed {len(removed)} archive partitions before {cutoff} from {self.base_path}")
+        return removed
+
+    def read(
+        self,
+        table_label: str,
+        columns: Optional[List[str]] = None,
+        tanggal_list: Optional[List[date]] = None,
+        start_date: Optional[date] = None,
+        end_date: Optional[date] = None,
+        card_types: Optional[List[str]] = None
+    ) -> pd.DataFrame:
+        """Baca archive dengan projection kolom dan filter tanggal/card type yang di-push down ke scan"""
+        table_path = self._table_path(table_label)
+        if not os.path.isdir(table_path):
+            raise FileNotFoundError(f"No cleaned archive for {table_label} at {table_path}")
+
+        dataset = ds.dataset(table_path, format='parquet', partitioning=PARTITIONING)
+
+        conditions = []
+        if tanggal_list is not None:
+            conditions.append(ds.field('tanggal').isin(pa.array(sorted(set(tanggal_list)), pa.date32())))
+        if start_date is not None:
+            conditions.append(ds.field('tanggal') >= pa.scalar(start_date, pa.date32()))
+        if end_date is not None:
+            conditions.append(ds.field('tanggal') <= pa.scalar(end_date, pa.date32()))
+        if card_types is not None:
+            conditions.append(ds.field('card_type_var').isin(card_types))
+
+        row_filter = None
+        for condition in conditions:
+            row_filter = condition if row_filter is None else row_filter & condition
+
+        if columns is not None and 'tanggal' not in columns:
+            columns = ['tanggal'] + list(columns)
+        df = dataset.to_table(columns=columns, filter=row_filter).to_pandas()
+
+        # Tanggal dan dtype kembali seperti frame hasil clean_and_transform
+        df['tanggal'] = pd.to_datetime(df['tanggal'])
+        df = apply_transaksi_schema(df, table_label, report_memory=False)
+        logger.info(f"Read {len(df)} archived rows of {table_label} ({len(df.columns)} columns)")
+        return df
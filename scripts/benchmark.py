@@ -0,0 +1,214 @@
+import pandas as pd
+import argparse
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional
+from extract import DataExtractor, TRANSAKSI_SOURCES
+from transform import DataTransformer
+from load import DataLoader
+from metrics import StageMetrics
+from reference_cache import ReferenceDataCache, standardize_no_body_series
+from schema import apply_transaksi_schema
+from synthetic_data import SyntheticDataGenerator, split_rows
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+BENCHMARK_PATH = '/opt/airflow/data/benchmark'
+
+REPORT_COLUMNS = ['scale', 'mode', 'stage', 'calls', 'duration_sec', 'rows_in', 'rows_out', 'rows_per_sec', 'peak_rss_mb']
+
+
+def prepare_input(scale: int, work_path: str, reference_path: str, regenerate: bool = False) -> str:
+    """Folder input sintetis per scale; dipakai ulang selama file-nya ada (generator deterministik per seed)"""
+    input_path = os.path.join(work_path, f'scale_{scale}', 'input')
+    if regenerate or not os.path.exists(os.path.join(input_path, 'dummy_transaksi_halte.csv')):
+        SyntheticDataGenerator(reference_path).generate(input_path, **split_rows(scale))
+    return input_path
+
+
+def run_file_stages(input_path: str) -> StageMetrics:
+    """Extract dari CSV, clean, dan aggregate tanpa database"""
+    metrics = StageMetrics()
+    # Engine sqlite hanya untuk memenuhi constructor, mode file tidak membuka koneksi ke database
+    transformer = DataTransformer('sqlite://')
+    transformer.metrics = metrics
+
+    frames = {}
+    for key, table_name in TRANSAKSI_SOURCES.items():
+        with metrics.stage(f'read_csv:{table_name}') as stage:
+            df = pd.read_csv(
+                f'{input_path}/{table_name}.csv',
+                dtype={'card_number_var': str},
+                parse_dates=['waktu_transaksi', 'insert_on_dtm']
+            )
+            frames[key] = apply_transaksi_schema(df, table_name, report_memory=False)
+            stage['rows_out'] = len(df)
+
+    with metrics.stage('reference_data') as stage:
+        cache = ReferenceDataCache(transformer.standardize_no_body_series, input_path, os.path.join(input_path, 'cache'))
+        reference_data = cache.load_all()
+        stage['rows_out'] = sum(len(df) for df in reference_data.values())
+
+    df_bus_clean, df_halte_clean = transformer.clean_and_transform(frames['transaksi_bus'], frames['transaksi_halte'])
+    transformer.aggregate_data(df_bus_clean, df_halte_clean, reference_data)
+    return metrics
+
+
+def run_standardize_stages(scale: int, reference_path: str) -> StageMetrics:
+    """standardize_no_body per row (Series.apply, cara lama) vs standardize_no_body_series untuk scale no body tap bus"""
+    metrics = StageMetrics()
+    transformer = DataTransformer('sqlite://')
+    no_body = SyntheticDataGenerator(reference_path).no_body_values(scale)
+
+    with metrics.stage('standardize:apply', rows_in=scale) as stage:
+        expected = no_body.apply(transformer.standardize_no_body)
+        stage['rows_out'] = len(expected)
+
+    cache = {}
+    with metrics.stage('standardize:vectorized', rows_in=scale) as stage:
+        result = standardize_no_body_series(no_body, cache)
+        stage['rows_out'] = len(result)
+
+    # Chunk berikutnya di mode streaming: semua nilai unik sudah ada di cache
+    with metrics.stage('standardize:vectorized_cached', rows_in=scale) as stage:
+        result_cached = standardize_no_body_series(no_body, cache)
+        stage['rows_out'] = len(result_cached)
+
+    for label, actual in (('vectorized', result), ('vectorized_cached', result_cached)):
+        mismatched = ~((actual == expected) | (actual.isna() & expected.isna()))
+        if mismatched.any():
+            raise AssertionError(
+                f"standardize:{label} differs from standardize_no_body for {int(mismatched.sum())} rows, "
+                f"e.g. {no_body[mismatched].head(5).tolist()}"
+            )
+    logger.info(f"standardize_no_body_series matches standardize_no_body on {scale} rows ({no_body.nunique()} unique)")
+    return metrics
+
+
+def run_postgres_stages(db_connection_string: str, input_path: str) -> StageMetrics:
+    """Seluruh pipeline terhadap PostgreSQL; table transaksi dan output_by_* di database ini ditimpa"""
+    metrics = StageMetrics()
+    extractor = DataExtractor(db_connection_string)
+    transformer = DataTransformer(db_connection_string)
+    loader = DataLoader(db_connection_string)
+    for component in (extractor, transformer, loader):
+        component.metrics = metrics
+
+    for table_name in TRANSAKSI_SOURCES.values():
+        with metrics.stage(f'bulk_load:{table_name}') as stage:
+            stage['rows_out'] = extractor.bulk_load_csv_to_postgres(
+                table_name, f'{input_path}/{table_name}.csv', mode='replace'
+            )
+
+    reference_data = extractor.extract_csv_files(input_path)
+    postgres_data = extractor.extract_from_postgres(full_refresh=True)
+
+    df_bus_clean, df_halte_clean = transformer.clean_and_transform(
+        postgres_data['transaksi_bus'], postgres_data['transaksi_halte']
+    )
+    aggregated_data = transformer.aggregate_data(df_bus_clean, df_halte_clean, reference_data)
+    loader.load_aggregated_data(aggregated_data, mode='replace', write_csv=False)
+
+    transformer.aggregate_in_database(reference_data)
+
+    for component in (extractor, transformer, loader):
+        component.engine.dispose()
+    return metrics
+
+
+def run_scale(
+    scale: int,
+    mode: str,
+    input_path: Optional[str],
+    db_connection_string: Optional[str] = None,
+    reference_path: str = '/opt/airflow/data/input'
+) -> List[Dict]:
+    logger.info(f"Benchmarking scale={scale} mode={mode}")
+    if mode == 'file':
+        metrics = run_file_stages(input_path)
+    elif mode == 'standardize':
+        metrics = run_standardize_stages(scale, reference_path)
+    else:
+        metrics = run_postgres_stages(db_connection_string, input_path)
+
+    return [
+        {'scale': scale, 'mode': mode, **{col: record.get(col) for col in REPORT_COLUMNS[2:]}}
+        for record in metrics.records.values()
+    ]
+
+
+def compare_reports(report: pd.DataFrame, baseline_path: str) -> pd.DataFrame:
+    """Rasio terhadap report commit lain; speedup > 1 berarti lebih cepat dari baseline"""
+    baseline = pd.read_csv(baseline_path)
+    merged = report.merge(baseline, on=['scale', 'mode', 'stage'], how='left', suffixes=('', '_baseline'))
+    merged['speedup'] = (merged['duration_sec_baseline'] / merged['duration_sec']).round(2)
+    merged['peak_rss_delta_mb'] = (merged['peak_rss_mb'] - merged['peak_rss_mb_baseline']).round(1)
+    return merged[['scale', 'mode', 'stage', 'duration_sec_baseline', 'duration_sec', 'speedup', 'peak_rss_delta_mb']]
+
+
+def run_benchmark(
+    scales: List[int],
+    modes: List[str],
+    report_path: str,
+    db_connection_string: Optional[str] = None,
+    work_path: str = BENCHMARK_PATH,
+    reference_path: str = '/opt/airflow/data/input',
+    baseline_path: Optional[str] = None,
+    regenerate: bool = False
+) -> pd.DataFrame:
+    # Mode postgres me-replace table transaksi dan output, jadi database-nya harus disebut eksplisit
+    if 'postgres' in modes and not db_connection_string:
+        raise ValueError("Mode postgres requires a separate benchmark database (db_connection_string)")
+
+    results = []
+    for scale in scales:
+        # Mode standardize membuat no body sendiri di memory, tidak butuh CSV transaksi
+        input_path = None
+        if any(mode != 'standardize' for mode in modes):
+            input_path = prepare_input(scale, work_path, reference_path, regenerate)
+        for mode in modes:
+            # Process baru per run supaya peak RSS tidak terbawa dari scale/mode sebelumnya
+            with ProcessPoolExecutor(max_workers=1) as executor:
+                results.extend(executor.submit(
+                    run_scale, scale, mode, input_path, db_connection_string, reference_path
+                ).result())
+
+    report = pd.DataFrame(results, columns=REPORT_COLUMNS).round(
+        {'duration_sec': 3, 'rows_per_sec': 0, 'peak_rss_mb': 1}
+    )
+    report.to_csv(report_path, index=False)
+    logger.info(f"Saved benchmark report ({len(report)} stages) to {report_path}\n{report.to_string(index=False)}")
+
+    if baseline_path:
+        comparison = compare_reports(report, baseline_path)
+        logger.info(f"Comparison against {baseline_path}:\n{comparison.to_string(index=False)}")
+
+    return report
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark throughput dan memory tiap stage ETL pada data sintetis')
+    parser.add_argument('--scales', default='100000,1000000,10000000', help='Total tap per scale, dipisah koma')
+    parser.add_argument('--modes', default='file', help='file, postgres, dan/atau standardize, dipisah koma')
+    parser.add_argument('--report', default='benchmark_report.csv')
+    parser.add_argument('--baseline', help='Report CSV dari commit lain untuk dibandingkan')
+    parser.add_argument('--db', help='Wajib untuk mode postgres: database terpisah, table transaksi dan output ditimpa')
+    parser.add_argument('--work-path', default=BENCHMARK_PATH)
+    parser.add_argument('--reference-path', default='/opt/airflow/data/input')
+    parser.add_argument('--regenerate', action='store_true')
+    args = parser.parse_args()
+    if 'postgres' in args.modes.split(',') and not args.db:
+        parser.error('postgres mode requires --db pointing to a separate database')
+
+    run_benchmark(
+        [int(scale) for scale in args.scales.split(',')],
+        args.modes.split(','),
+        args.report,
+        args.db,
+        args.work_path,
+        args.reference_path,
+        args.baseline,
+        args.regenerate
+    )
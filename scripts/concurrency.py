@@ -0,0 +1,22 @@
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, TypeVar
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+T = TypeVar('T')
+
+
+def run_branches(branches: Dict[str, Callable[[], T]], max_workers: int = 1) -> Dict[str, T]:
+    """Jalankan cabang independen (bus/halte, agregasi per dimensi) berurutan atau di thread pool.
+
+    Thread dipakai, bukan process: frame besar tidak perlu di-pickle, dan read_sql, groupby, serta
+    merge pandas sebagian besar berjalan di luar GIL. Exception dari cabang mana pun diteruskan ke pemanggil.
+    """
+    if max_workers <= 1 or len(branches) <= 1:
+        return {name: branch() for name, branch in branches.items()}
+
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(branches))) as executor:
+        futures = {name: executor.submit(branch) for name, branch in branches.items()}
+        return {name: future.result() for name, future in futures.items()}
@@ -0,0 +1,84 @@
+import pandas as pd
+import difflib
+import logging
+from typing import Dict, List, Optional
+from reference_cache import normalize_shelter_names
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Kemiripan minimum (difflib ratio) untuk nama shelter yang tidak cocok persis, mis. 'Bundaran H.I' vs 'Bundaran HI'
+FUZZY_CUTOFF = 0.85
+
+CORRIDOR_DIMENSIONS = ['tanggal', 'corridor_code', 'corridor_name', 'gate_in_boo']
+
+
+class ShelterCorridorIndex:
+    """Lookup shelter -> koridor: hash lookup pada nama yang dinormalisasi, fuzzy match sebagai fallback.
+
+    Semua pencocokan dikerjakan per nama shelter yang berbeda, bukan per row, dan hasilnya di-cache
+    selama objek hidup (satu task), jadi fuzzy match untuk nama yang sama tidak pernah diulang.
+    """
+
+    def __init__(self, shelter_index: pd.DataFrame, fuzzy_cutoff: float = FUZZY_CUTOFF):
+        self.shelter_index = shelter_index
+        self.fuzzy_cutoff = fuzzy_cutoff
+        self.keys = list(shelter_index.index)
+        self._matches: Dict[str, Optional[str]] = {}
+
+    def _match_key(self, shelter_name: str, shelter_key: str) -> Optional[str]:
+        if shelter_name in self._matches:
+            return self._matches[shelter_name]
+
+        match = shelter_key if shelter_key in self.shelter_index.index else None
+        if match is None and shelter_key:
+            candidates = difflib.get_close_matches(shelter_key, self.keys, n=1, cutoff=self.fuzzy_cutoff)
+            if candidates:
+                match = candidates[0]
+                logger.info(f"Shelter '{shelter_name}' fuzzy matched to '{match}'")
+
+        self._matches[shelter_name] = match
+        return match
+
+    def resolve(self, shelter_names: List[str]) -> pd.DataFrame:
+        """corridor_code/corridor_name per nama shelter (index = nama asli); NaN jika tidak ada yang cocok"""
+        names = pd.Series(shelter_names, dtype=object)
+        keys = normalize_shelter_names(names)
+        matched_keys = [
+            self._match_key(name, key) for name, key in zip(names, keys.fillna(''))
+        ]
+        corridors = self.shelter_index.reindex(matched_keys)
+        corridors.index = pd.Index(names, name='shelter_name_var')
+        return corridors
+
+    def lookup(self, shelter_names: pd.Series) -> pd.DataFrame:
+        """Koridor untuk setiap row, sejajar dengan shelter_names; resolve hanya untuk nilai unik"""
+        codes, uniques = pd.factorize(shelter_names)
+        corridors = self.resolve(list(uniques)).reset_index(drop=True)
+        # Code -1 (shelter NaN) tidak ada di index, jadi reindex mengisinya dengan NaN
+        result = corridors.reindex(codes)
+        result.index = shelter_names.index
+        return result
+
+
+def derive_corridor_view(cube: pd.DataFrame, corridor_index: ShelterCorridorIndex) -> pd.DataFrame:
+    """output_by_corridor dari row halte di rollup cube; shelter yang tidak cocok ke koridor mana pun dilewati"""
+    # Diringkas dulu ke grain shelter supaya lookup dan group by koridor berjalan di sedikit row
+    halte = cube[cube['shelter_name_var'].notna()].groupby(
+        ['tanggal', 'shelter_name_var', 'gate_in_boo'], as_index=False, observed=True
+    )[['jumlah_pelanggan', 'total_amount']].sum()
+    corridors = corridor_index.lookup(halte['shelter_name_var'])
+
+    unmatched = corridors['corridor_code'].isna()
+    if unmatched.any():
+        logger.info(
+            f"{halte.loc[unmatched.to_numpy(), 'shelter_name_var'].nunique()} shelters without corridor, "
+            f"{int(halte.loc[unmatched.to_numpy(), 'jumlah_pelanggan'].sum())} taps skipped"
+        )
+
+    df = halte[['tanggal', 'gate_in_boo', 'jumlah_pelanggan', 'total_amount']].assign(
+        corridor_code=corridors['corridor_code'].to_numpy(),
+        corridor_name=corridors['corridor_name'].to_numpy()
+    )
+    df = df[~unmatched.to_numpy()]
+    return df.groupby(CORRIDOR_DIMENSIONS, observed=True)[['jumlah_pelanggan', 'total_amount']].sum().reset_index()
@@ -0,0 +1,189 @@
+import pandas as pd
+import numpy as np
+import io
+import logging
+from sqlalchemy.engine import Engine
+from datetime import datetime
+from typing import Dict, Iterable, Optional, Tuple
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Default late-arrival window: tap yang datang ulang lebih lama dari ini setelah waktu_transaksi-nya tidak lagi dikenali
+DEDUP_WINDOW_DAYS = 35
+
+# uuid disimpan sebagai md5(uuid)::uuid, 16 byte fixed-width berapa pun format uuid sumbernya.
+# Tap dianggap duplikat jika uuid-nya sudah tercatat dengan waktu_transaksi lain; tap yang sama
+# (uuid dan waktu sama) tetap dihitung, jadi rerun atau backfill tanggal yang sama tidak kehilangan data
+STALE_UUIDS_QUERY = """
+    SELECT batch.uuid
+    FROM {batch_table} batch
+    JOIN etl_processed_uuid processed
+      ON processed.uuid_hash = {hash_expression}
+    WHERE processed.waktu_transaksi <> batch.waktu_transaksi
+"""
+
+# Anti-join dulu: rerun yang seluruh uuid-nya sudah tercatat tidak membayar insert + pengecekan konflik per row.
+# ON CONFLICT tetap ada untuk backfill paralel yang mencatat uuid yang sama bersamaan
+REGISTER_UUIDS_QUERY = """
+    INSERT INTO etl_processed_uuid (uuid_hash, waktu_transaksi)
+    SELECT {hash_expression}, batch.waktu_transaksi
+    FROM {batch_table} batch
+    WHERE NOT EXISTS (
+        SELECT 1 FROM etl_processed_uuid processed WHERE processed.uuid_hash = {hash_expression}
+    )
+    ON CONFLICT (uuid_hash) DO NOTHING
+"""
+
+# Untuk batch tanpa kolom uuid_hash (tmp_pelanggan di engine sql)
+UUID_HASH_EXPRESSION = 'md5(batch.uuid)::uuid'
+
+# Cek basi dan pencatatan harus atomik terhadap run lain: tanpa lock, dua backfill paralel sama-sama lolos cek
+# sebelum salah satunya mencatat, dan uuid yang sama terhitung di dua tanggal
+DEDUP_INDEX_LOCK = "SELECT pg_advisory_xact_lock(hashtext('etl_processed_uuid'))"
+
+# Kolom index diberi nama lain supaya kolom table transaksi tetap bisa ditulis tanpa alias
+REGISTERED_TIME_JOIN = """
+    LEFT JOIN (SELECT uuid_hash, waktu_transaksi AS registered_waktu FROM etl_processed_uuid) processed
+      ON processed.uuid_hash = md5({table}.uuid)::uuid
+"""
+
+# uuid yang muncul lebih dari sekali dalam satu batch: pilih row dengan waktu yang sudah tercatat di index, lalu
+# waktu_transaksi dan insert_on_dtm paling awal (NULL terakhir). Pilihan acak bisa jatuh ke row yang kemudian
+# dianggap basi oleh index, sehingga uuid itu tidak terhitung sama sekali
+PREFERRED_ROW_COLUMNS = ['waktu_transaksi', 'insert_on_dtm']
+
+
+def preferred_row_order(table_name: str, index_aware: bool = False) -> Tuple[str, str]:
+    """JOIN dan ORDER BY setelah uuid untuk DISTINCT ON (uuid), aturan yang sama dengan drop_duplicate_uuids"""
+    order_by = ', '.join(f'{table_name}.{col}' for col in PREFERRED_ROW_COLUMNS + ['ctid'])
+    if not index_aware:
+        return '', order_by
+    return (
+        REGISTERED_TIME_JOIN.format(table=table_name),
+        f'(registered_waktu = {table_name}.waktu_transaksi) IS TRUE DESC, {order_by}'
+    )
+
+
+def drop_duplicate_uuids(df: pd.DataFrame, registered: Optional[Dict[str, datetime]] = None) -> pd.DataFrame:
+    """Satu row per uuid; urutan row yang tersisa tetap seperti urutan asal"""
+    duplicated = df['uuid'].duplicated(keep=False).to_numpy()
+    if not duplicated.any():
+        return df
+
+    candidates = df.loc[duplicated, ['uuid']].assign(_position=np.flatnonzero(duplicated))
+    sort_columns = []
+    if registered:
+        registered_waktu = pd.to_datetime(candidates['uuid'].map(registered)).to_numpy()
+        waktu = pd.to_datetime(df.loc[duplicated, 'waktu_transaksi']).to_numpy()
+        candidates['_unregistered'] = registered_waktu != waktu
+        sort_columns.append('_unregistered')
+    for col in PREFERRED_ROW_COLUMNS:
+        if col in df.columns:
+            candidates[col] = pd.to_datetime(df.loc[duplicated, col]).to_numpy()
+            sort_columns.append(col)
+
+    # Sort stabil: row yang sama persis urutannya tetap dipilih kemunculan pertama, seperti keep='first'
+    kept = candidates.sort_values(sort_columns + ['_position'], na_position='last', kind='stable').drop_duplicates('uuid')
+    keep = ~duplicated
+    keep[kept['_position'].to_numpy()] = True
+    return df[keep]
+
+
+class UuidDedupIndex:
+    """Index uuid yang sudah pernah dihitung, lintas run, di table etl_processed_uuid.
+
+    Setiap batch di-COPY ke temp table lalu di-join ke primary key index, jadi memory worker dan data
+    yang dibaca sebanding dengan ukuran batch, bukan seluruh histori.
+    """
+
+    def __init__(self, engine: Engine):
+        self.engine = engine
+
+    def registered_times(self, uuids: Iterable[str]) -> Dict[str, datetime]:
+        """waktu_transaksi yang tercatat untuk uuid yang diminta (hanya uuid yang sudah ada di index)"""
+        uuids = list(uuids)
+        if not uuids:
+            return {}
+
+        conn = self.engine.raw_connection()
+        try:
+            cursor = conn.cursor()
+            cursor.execute("""
+                SELECT batch.uuid, processed.waktu_transaksi
+                FROM unnest(%s::text[]) AS batch (uuid)
+                JOIN etl_processed_uuid processed ON processed.uuid_hash = md5(batch.uuid)::uuid
+            """, (uuids,))
+            registered = dict(cursor.fetchall())
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            conn.close()
+        return registered
+
+    def filter_processed(self, df: pd.DataFrame, table_label: str) -> pd.DataFrame:
+        """Buang tap yang uuid-nya sudah dihitung run sebelumnya dengan waktu lain, lalu catat sisanya"""
+        # Tap tanpa waktu tidak masuk output mana pun (engine sql membuangnya dengan tanggal IS NOT NULL),
+        # jadi tidak dicek dan tidak dicatat; waktu_transaksi di index NOT NULL
+        batch = df.loc[df['waktu_transaksi'].notna(), ['uuid', 'waktu_transaksi']]
+        if batch.empty:
+            return df
+
+        buffer = io.StringIO()
+        batch.to_csv(buffer, index=False, header=False)
+        buffer.seek(0)
+
+        conn = self.engine.raw_connection()
+        try:
+            cursor = conn.cursor()
+            # Hash dihitung sekali saat COPY (generated column), bukan di setiap join
+            cursor.execute("""
+                CREATE TEMP TABLE tmp_batch_uuid (
+                    uuid TEXT,
+                    waktu_transaksi TIMESTAMP,
+                    uuid_hash UUID GENERATED ALWAYS AS (md5(uuid)::uuid) STORED
+                ) ON COMMIT DROP
+            """)
+            cursor.copy_expert('COPY tmp_batch_uuid (uuid, waktu_transaksi) FROM STDIN WITH (FORMAT csv)', buffer)
+            cursor.execute('ANALYZE tmp_batch_uuid')
+            cursor.execute(DEDUP_INDEX_LOCK)
+
+            queries = {'batch_table': 'tmp_batch_uuid', 'hash_expression': 'batch.uuid_hash'}
+            cursor.execute(STALE_UUIDS_QUERY.format(**queries))
+            stale_uuids = [uuid for (uuid,) in cursor.fetchall()]
+
+            cursor.execute(REGISTER_UUIDS_QUERY.format(**queries))
+            registered = cursor.rowcount
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            conn.close()
+
+        logger.info(
+            f"Dedup index {table_label}: {len(stale_uuids)} of {len(batch)} taps already processed in earlier runs, "
+            f"{registered} new uuids registered"
+        )
+        if not stale_uuids:
+            return df
+        return df[~df['uuid'].isin(stale_uuids)]
+
+    def evict_before(self, cutoff: datetime) -> int:
+        """Hapus uuid dengan waktu_transaksi sebelum cutoff (di luar late-arrival window)"""
+        conn = self.engine.raw_connection()
+        try:
+            cursor = conn.cursor()
+            cursor.execute('DELETE FROM etl_processed_uuid WHERE waktu_transaksi < %s', (cutoff,))
+            evicted = cursor.rowcount
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            conn.close()
+
+        logger.info(f"Evicted {evicted} uuids processed before {cutoff} from dedup index")
+        return evicted
@@ -0,0 +1,62 @@
+import pandas as pd
+import numpy as np
+import logging
+from typing import Optional
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Ukuran sel grid dalam derajat (~1,1 km di Jakarta). Sel dihitung dari (-90, -180), jadi index sel
+# stabil antar run dan antar engine; jangan diganti tanpa mengosongkan output_by_grid_cell
+GRID_CELL_DEGREES = 0.01
+
+GRID_DIMENSIONS = ['tanggal', 'lat_index', 'lon_index', 'gate_in_boo']
+
+# Kolom frame bersih yang dibutuhkan binning grid (di luar kolom cube)
+GRID_TAP_COLUMNS = ['tanggal', 'gate_in_boo', 'card_number_var', 'fare_int', 'p_latitude_flo', 'p_longitude_flo']
+
+
+def grid_indices(latitude: np.ndarray, longitude: np.ndarray, cell_degrees: float = GRID_CELL_DEGREES):
+    """Index baris/kolom sel grid untuk array koordinat; koordinat kosong atau di luar bumi diberi -1"""
+    latitude = np.asarray(latitude, dtype='float64')
+    longitude = np.asarray(longitude, dtype='float64')
+    valid = (
+        np.isfinite(latitude) & np.isfinite(longitude)
+        & (latitude >= -90) & (latitude <= 90) & (longitude >= -180) & (longitude <= 180)
+    )
+
+    # Ekspresi yang sama dipakai OUTPUT_QUERIES engine sql, jadi pembulatan floating point identik
+    lat_index = np.floor((np.where(valid, latitude, 0) + 90) / cell_degrees).astype('int32')
+    lon_index = np.floor((np.where(valid, longitude, 0) + 180) / cell_degrees).astype('int32')
+    return np.where(valid, lat_index, -1), np.where(valid, lon_index, -1)
+
+
+def _binned_taps(df: pd.DataFrame) -> pd.DataFrame:
+    lat_index, lon_index = grid_indices(df['p_latitude_flo'].to_numpy(), df['p_longitude_flo'].to_numpy())
+    return pd.DataFrame({
+        'tanggal': df['tanggal'].to_numpy(),
+        'lat_index': lat_index,
+        'lon_index': lon_index,
+        'gate_in_boo': df['gate_in_boo'].to_numpy(),
+        'jumlah_pelanggan': df['card_number_var'].notna().to_numpy().astype('int64'),
+        'total_amount': df['fare_int'].to_numpy(dtype='int64'),
+    })
+
+
+def aggregate_by_grid_cell(df_bus: pd.DataFrame, df_halte: pd.DataFrame) -> pd.DataFrame:
+    """Jumlah tap bus + halte per sel grid; tap tanpa koordinat valid dilewati"""
+    taps = pd.concat([_binned_taps(df_bus), _binned_taps(df_halte)], ignore_index=True)
+
+    located = taps['lat_index'].to_numpy() >= 0
+    if not located.all():
+        logger.info(f"{int((~located).sum())} taps without valid coordinates skipped from grid aggregation")
+
+    return taps[located].groupby(GRID_DIMENSIONS, as_index=False)[['jumlah_pelanggan', 'total_amount']].sum()
+
+
+def fold_grid(running: Optional[pd.DataFrame], partial: pd.DataFrame) -> pd.DataFrame:
+    if running is None:
+        return partial
+    return pd.concat([running, partial], ignore_index=True).groupby(GRID_DIMENSIONS, as_index=False)[
+        ['jumlah_pelanggan', 'total_amount']
+    ].sum()
@@ -0,0 +1,101 @@
+import logging
+import os
+import resource
+import threading
+import time
+from contextlib import contextmanager
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+from datetime import datetime
+from typing import Dict, Iterator, Optional
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Logging diagnostik (scan isnull, contoh standardisasi, ukuran memory frame) mahal untuk data besar;
+# default mati di production, bisa dinyalakan lewat env atau param DAG 'diagnostic_logging'
+DIAGNOSTIC_LOGGING = os.environ.get('PIPELINE_DIAGNOSTIC_LOGGING', 'false').lower() in ('1', 'true', 'yes')
+
+
+def peak_rss_mb() -> float:
+    # ru_maxrss di Linux dalam KB; nilainya peak sepanjang umur process, bukan per stage
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+class StageMetrics:
+    """Waktu, jumlah row, dan peak RSS per stage; disimpan satu row per stage per DAG run di pipeline_stage_metrics"""
+
+    def __init__(self, run_id: Optional[str] = None, task_id: Optional[str] = None):
+        self.run_id = run_id
+        self.task_id = task_id
+        self.records: Dict[str, Dict] = {}
+        # Stage dari cabang yang berjalan paralel (run_branches) dicatat ke objek yang sama
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def stage(self, stage_name: str, rows_in: Optional[int] = None) -> Iterator[Dict]:
+        """Isi record['rows_out'] di dalam blok; stage yang dipanggil berulang (per chunk) dijumlahkan"""
+        record = {'rows_in': rows_in, 'rows_out': None}
+        started_at = datetime.now()
+        start = time.perf_counter()
+        status = 'failed'
+        try:
+            yield record
+            status = 'success'
+        finally:
+            with self._lock:
+                self._record(stage_name, started_at, time.perf_counter() - start, record, status)
+
+    def _record(self, stage_name: str, started_at: datetime, duration: float, record: Dict, status: str):
+        summary = self.records.setdefault(stage_name, {
+            'stage': stage_name,
+            'status': 'success',
+            'calls': 0,
+            'started_at': started_at,
+            'duration_sec': 0.0,
+            'rows_in': None,
+            'rows_out': None,
+        })
+        summary['calls'] += 1
+        summary['duration_sec'] += duration
+        if status != 'success':
+            summary['status'] = status
+        for key in ('rows_in', 'rows_out'):
+            if record[key] is not None:
+                summary[key] = (summary[key] or 0) + int(record[key])
+
+        rows = summary['rows_out'] if summary['rows_out'] is not None else summary['rows_in']
+        summary['rows_per_sec'] = rows / max(summary['duration_sec'], 1e-9) if rows is not None else None
+        summary['peak_rss_mb'] = peak_rss_mb()
+
+        logger.info(
+            f"Stage {stage_name} {status} in {duration:.3f}s "
+            f"(rows_in={record['rows_in']}, rows_out={record['rows_out']}, peak RSS {summary['peak_rss_mb']:.1f} MB)"
+        )
+
+    def flush(self, engine: Engine):
+        """Tulis semua stage ke pipeline_stage_metrics; kegagalan menulis metrics tidak menggagalkan task"""
+        if not self.records:
+            return
+
+        rows = [
+            {**summary, 'run_id': self.run_id, 'task_id': self.task_id}
+            for summary in self.records.values()
+        ]
+        try:
+            with engine.begin() as conn:
+                conn.execute(
+                    text("""
+                        INSERT INTO pipeline_stage_metrics
+                            (run_id, task_id, stage, status, calls, started_at, duration_sec,
+                             rows_in, rows_out, rows_per_sec, peak_rss_mb)
+                        VALUES
+                            (:run_id, :task_id, :stage, :status, :calls, :started_at, :duration_sec,
+                             :rows_in, :rows_out, :rows_per_sec, :peak_rss_mb)
+                    """),
+                    rows
+                )
+            logger.info(f"Saved {len(rows)} stage metrics for {self.task_id} ({self.run_id})")
+            self.records = {}
+        except Exception as e:
+            logger.warning(f"Failed to save stage metrics: {str(e)}")
@@ -0,0 +1,207 @@
+import pandas as pd
+import numpy as np
+import argparse
+import logging
+import os
+import shutil
+import sys
+import tempfile
+from datetime import date
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import OperationalError
+from typing import Dict, List, Optional, Tuple
+from extract import DataExtractor, TRANSAKSI_SOURCES
+from transform import DataTransformer
+from load import OUTPUT_TABLES
+from reference_cache import standardize_no_body_series
+from archive import CleanedTapArchive
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+MEASURE_COLUMNS = ['jumlah_pelanggan', 'total_amount', 'jumlah_pelanggan_route', 'total_amount_route']
+
+# (input, hasil yang diharapkan) untuk standardize_no_body; None = NaN dikembalikan apa adanya
+NO_BODY_CASES = [
+    ('KLG4590', 'KLG-4590'),
+    ('LGS4315-', 'LGS-4315'),
+    ('KLG4590B', 'KLG-4590'),
+    ('PTK_0125_A', 'PTK-0125'),
+    ('klg4590', 'KLG-4590'),
+    (' nbr 12 ', 'NBR-012'),
+    ('BKTB4590', 'BKT-4590'),
+    ('TJ', 'TJ'),
+    ('bus-', 'BUS-'),
+    ('4590', '4590'),
+    ('', ''),
+    (None, None),
+    (np.nan, None),
+]
+
+
+def _same(actual, expected) -> bool:
+    if pd.isna(expected):
+        return pd.isna(actual)
+    return actual == expected
+
+
+def _random_no_body(n: int, seed: int) -> pd.Series:
+    """No body acak di luar format armada: huruf besar/kecil, separator, spasi, angka dengan nol di depan"""
+    rng = np.random.default_rng(seed)
+    alphabet = np.array(list('ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789-_ .'))
+    lengths = rng.integers(0, 12, n)
+    values = [''.join(rng.choice(alphabet, length)) for length in lengths]
+    return pd.Series(values, dtype=object).mask(rng.random(n) < 0.05)
+
+
+def check_standardize_no_body(sample_size: int = 100000, seed: int = 42) -> List[Tuple]:
+    """standardize_no_body_series harus sama persis dengan standardize_no_body, baik cache kosong maupun terisi"""
+    transformer = DataTransformer('sqlite://')
+    mismatches = []
+
+    for value, expected in NO_BODY_CASES:
+        scalar = transformer.standardize_no_body(value)
+        if not _same(scalar, expected):
+            mismatches.append(('standardize_no_body', value, expected, scalar))
+
+    values = pd.concat([pd.Series([value for value, _ in NO_BODY_CASES], dtype=object), _random_no_body(sample_size, seed)],
+                       ignore_index=True)
+    expected = values.apply(transformer.standardize_no_body)
+
+    cache = {}
+    for label in ('vectorized', 'vectorized_cached'):
+        result = standardize_no_body_series(values, cache)
+        for value, scalar, vectorized in zip(values, expected, result):
+            if not _same(vectorized, scalar):
+                mismatches.append((f'standardize_no_body_series:{label}', value, scalar, vectorized))
+
+    for check, value, expected_value, actual in mismatches:
+        logger.error(f"{check}({value!r}) = {actual!r}, expected {expected_value!r}")
+    logger.info(f"standardize_no_body parity: {len(values)} values, {len(mismatches)} mismatches")
+    return mismatches
+
+
+def check_archive_null_time() -> List[str]:
+    """Tap tanpa waktu_transaksi dilewati archive (bukan error), dan prune_before melewati direktori yang bukan tanggal"""
+    problems = []
+    base_path = tempfile.mkdtemp(prefix='archive_check_')
+    try:
+        archive = CleanedTapArchive(base_path)
+        waktu = pd.to_datetime(pd.Series(['2025-07-01 08:00', None, '2025-07-02 09:00']))
+        df = pd.DataFrame({
+            'uuid': ['a', 'b', 'c'],
+            'waktu_transaksi': waktu,
+            'tanggal': waktu.dt.normalize(),
+            'card_type_var': pd.Categorical(['BRIZZI', 'FLAZZ', 'BRIZZI']),
+            'fare_int': np.array([3500, 3500, 0], dtype='int32'),
+        })
+        written = archive.write('transaksi_halte', df)
+        if written != 2:
+            problems.append(f"write: {written} rows archived, expected 2 (NULL waktu_transaksi skipped)")
+
+        os.makedirs(os.path.join(base_path, 'transaksi_halte', 'tanggal=__HIVE_DEFAULT_PARTITION__'))
+        removed = archive.prune_before(date(2025, 7, 2))
+        if removed != ['transaksi_halte/tanggal=2025-07-01']:
+            problems.append(f"prune_before: removed {removed}, expected only tanggal=2025-07-01")
+    except Exception as e:
+        problems.append(f"{type(e).__name__}: {e}")
+    finally:
+        shutil.rmtree(base_path, ignore_errors=True)
+
+    for problem in problems:
+        logger.error(f"Archive NULL time check: {problem}")
+    logger.info(f"Archive NULL time check: {len(problems)} problems")
+    return problems
+
+
+def _comparable(df: pd.DataFrame, columns: List[str]) -> pd.DataFrame:
+    """Dimensi jadi teks ('' untuk NULL) dan measure jadi int64, supaya dtype pandas vs PostgreSQL tidak ikut dibandingkan"""
+    df = df[columns].copy()
+    for col in columns:
+        if col == 'tanggal':
+            df[col] = pd.to_datetime(df[col]).dt.strftime('%Y-%m-%d')
+        elif col in MEASURE_COLUMNS:
+            df[col] = df[col].astype('int64')
+        else:
+            df[col] = df[col].astype(object).where(df[col].notna(), '').astype(str)
+    return df
+
+
+def check_engine_parity(db_connection_string: str, input_path: str) -> Optional[Dict[str, int]]:
+    """Engine pandas vs engine sql pada CSV transaksi di input_path; jumlah row yang berbeda per output.
+
+    Table transaksi dan output_by_* di database ini ditimpa, jadi arahkan ke database terpisah.
+    None jika PostgreSQL tidak bisa dihubungi (cek dilewati).
+    """
+    engine = create_engine(db_connection_string)
+    try:
+        with engine.connect() as conn:
+            conn.execute(text('SELECT 1'))
+    except OperationalError as e:
+        logger.warning(f"PostgreSQL not reachable, engine parity check skipped: {str(e).splitlines()[0]}")
+        return None
+    finally:
+        engine.dispose()
+
+    extractor = DataExtractor(db_connection_string)
+    for table_name in TRANSAKSI_SOURCES.values():
+        extractor.bulk_load_csv_to_postgres(table_name, f'{input_path}/{table_name}.csv', mode='replace')
+    reference_data = extractor.extract_csv_files(input_path)
+    postgres_data = extractor.extract_from_postgres(full_refresh=True)
+
+    # Tanpa dedup index dan archive: keduanya menyimpan state lintas run yang akan membuat engine kedua berbeda
+    transformer = DataTransformer(db_connection_string)
+    df_bus_clean, df_halte_clean = transformer.clean_and_transform(
+        postgres_data['transaksi_bus'], postgres_data['transaksi_halte']
+    )
+    pandas_outputs = transformer.aggregate_data(df_bus_clean, df_halte_clean, reference_data)
+    transformer.aggregate_in_database(reference_data)
+
+    mismatches = {}
+    with transformer.engine.connect() as conn:
+        for key, (table_name, _) in OUTPUT_TABLES.items():
+            columns = list(pandas_outputs[key].columns)
+            sql_output = pd.read_sql(
+                text(f"SELECT {', '.join(columns)} FROM {table_name} WHERE tanggal = ANY(:tanggal_list)"),
+                conn,
+                params={'tanggal_list': list(extractor.affected_dates)}
+            )
+            diff = _comparable(pandas_outputs[key], columns).merge(
+                _comparable(sql_output, columns), how='outer', indicator=True
+            )
+            different = diff[diff['_merge'] != 'both']
+            mismatches[table_name] = len(different)
+
+            if len(different):
+                logger.error(
+                    f"{table_name}: {len(different)} rows differ (left_only = pandas, right_only = sql)\n"
+                    f"{different.head(10).to_string(index=False)}"
+                )
+            logger.info(f"{table_name}: pandas {len(pandas_outputs[key])} rows, sql {len(sql_output)} rows")
+
+    for component in (extractor, transformer):
+        component.engine.dispose()
+    logger.info(f"Engine parity: {sum(mismatches.values())} differing rows across {len(mismatches)} outputs")
+    return mismatches
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Cek hasil implementasi alternatif sama dengan implementasi acuan')
+    parser.add_argument('checks', nargs='+', choices=['standardize', 'engines', 'archive'])
+    parser.add_argument('--sample-size', type=int, default=100000)
+    parser.add_argument('--db', help='Wajib untuk engines: database terpisah, table transaksi dan output_by_* ditimpa')
+    parser.add_argument('--input-path', default='/opt/airflow/data/input')
+    args = parser.parse_args()
+    # Tanpa default: cek engines me-replace table transaksi, jadi tidak boleh jatuh ke database produksi
+    if 'engines' in args.checks and not args.db:
+        parser.error('engines check requires --db pointing to a separate database')
+
+    failed = False
+    if 'standardize' in args.checks:
+        failed |= bool(check_standardize_no_body(args.sample_size))
+    if 'archive' in args.checks:
+        failed |= bool(check_archive_null_time())
+    if 'engines' in args.checks:
+        mismatches = check_engine_parity(args.db, args.input_path)
+        failed |= bool(mismatches and any(mismatches.values()))
+    sys.exit(1 if failed else 0)
@@ -0,0 +1,162 @@
+import pandas as pd
+import numpy as np
+import glob
+import hashlib
+import logging
+import os
+import uuid
+from typing import Callable, Dict, List, Optional, Tuple
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+CACHE_PATH = '/opt/airflow/data/cache/reference'
+
+# Naikkan jika cara parsing/normalisasi berubah, supaya cache lama tidak dipakai
+CACHE_VERSION = 1
+
+REFERENCE_FILES = {
+    'realisasi_bus': ['dummy_realisasi_bus.csv'],
+    'routes': ['dummy_routes.csv'],
+    'shelter_corridor': ['dummy_shelter_corridor.csv'],
+    'route_lookup': ['dummy_realisasi_bus.csv', 'dummy_routes.csv'],
+    'shelter_index': ['dummy_shelter_corridor.csv'],
+}
+
+
+def normalize_shelter_names(names: pd.Series) -> pd.Series:
+    """Key pencocokan shelter: huruf kecil, tanpa tanda baca, spasi dirapikan"""
+    return (
+        names.astype('string')
+        .str.lower()
+        .str.replace(r'[^0-9a-z]+', ' ', regex=True)
+        .str.strip()
+    )
+
+
+def standardize_no_body_series(series: pd.Series, cache: Optional[Dict] = None) -> pd.Series:
+    """Versi vectorized DataTransformer.standardize_no_body: hanya nilai unik yang belum ada di cache yang diproses"""
+    if cache is None:
+        cache = {}
+    codes, uniques = pd.factorize(series)
+    if len(uniques) == 0:
+        return series.copy()
+
+    new_values = [value for value in uniques if value not in cache]
+    if new_values:
+        normalized = pd.Series(new_values, dtype=object).astype(str).str.upper().str.strip()
+        letter_part = normalized.str.extract(r'([A-Z]+)', expand=False).str[:3]
+        number_part = normalized.str.extract(r'(\d+)', expand=False).str.zfill(3)
+
+        standardized = (letter_part + '-' + number_part).where(
+            letter_part.notna() & number_part.notna(), normalized
+        )
+        cache.update(zip(new_values, standardized))
+
+    lookup = np.array([cache[value] for value in uniques], dtype=object)
+    result = pd.Series(lookup[codes], index=series.index, dtype=object)
+
+    # Nilai NaN dikembalikan apa adanya, sama seperti standardize_no_body
+    return result.where(codes != -1, series)
+
+
+def build_route_lookup(
+    df_realisasi: pd.DataFrame,
+    df_routes: pd.DataFrame,
+    standardize_series: Callable[[pd.Series], pd.Series]
+) -> pd.DataFrame:
+    """Realisasi + routes yang sudah di-join, di-index (tanggal_realisasi, bus_body_no) untuk lookup per bus"""
+    df = df_realisasi[['tanggal_realisasi', 'bus_body_no', 'rute_realisasi']].copy()
+    df['tanggal_realisasi'] = pd.to_datetime(df['tanggal_realisasi']).dt.normalize()
+    df['bus_body_no'] = standardize_series(df['bus_body_no'])
+
+    # Inner join sama dengan left merge + filter route_code notna di versi lama
+    lookup = df.merge(df_routes, left_on='rute_realisasi', right_on='route_code', how='inner')
+    return lookup.set_index(['tanggal_realisasi', 'bus_body_no'])[['route_code', 'route_name']].sort_index()
+
+
+def build_shelter_index(df_shelter_corridor: pd.DataFrame) -> pd.DataFrame:
+    """Shelter corridor di-index nama shelter yang sudah dinormalisasi untuk lookup hash per nama"""
+    df = df_shelter_corridor[['shelter_name_var', 'corridor_code', 'corridor_name']].dropna(subset=['shelter_name_var'])
+    df = df.assign(
+        shelter_key=normalize_shelter_names(df['shelter_name_var']),
+        corridor_code=df['corridor_code'].astype('string')
+    )
+
+    # Satu shelter hanya boleh menunjuk satu koridor; baris pertama di CSV yang dipakai
+    duplicated = df['shelter_key'].duplicated()
+    if duplicated.any():
+        logger.warning(f"{int(duplicated.sum())} duplicate shelters in shelter corridor reference, keeping the first")
+    return df[~duplicated].set_index('shelter_key')[['corridor_code', 'corridor_name']].sort_index()
+
+
+class ReferenceDataCache:
+    """Cache Parquet untuk reference CSV, di-key oleh path + mtime + size sehingga otomatis invalid saat file berubah"""
+
+    def __init__(
+        self,
+        standardize_series: Callable[[pd.Series], pd.Series],
+        base_path: str = '/opt/airflow/data/input',
+        cache_path: str = CACHE_PATH
+    ):
+        self.standardize_series = standardize_series
+        self.base_path = base_path
+        self.cache_path = cache_path
+
+    def _cache_key(self, file_names: List[str]) -> Tuple[str, str]:
+        """(key path sumber, key isi); cache untuk folder input lain tidak saling menghapus"""
+        paths = [os.path.realpath(os.path.join(self.base_path, file_name)) for file_name in file_names]
+        signature = [str(CACHE_VERSION)]
+        for path in paths:
+            stat = os.stat(path)
+            signature.append(f'{path}:{stat.st_mtime_ns}:{stat.st_size}')
+        return (
+            hashlib.sha1('|'.join(paths).encode()).hexdigest()[:8],
+            hashlib.sha1('|'.join(signature).encode()).hexdigest()[:16]
+        )
+
+    def _build(self, name: str, frames: Dict[str, pd.DataFrame]) -> pd.DataFrame:
+        if name == 'route_lookup':
+            return build_route_lookup(frames['realisasi_bus'], frames['routes'], self.standardize_series)
+        if name == 'shelter_index':
+            return build_shelter_index(frames['shelter_corridor'])
+
+        df = pd.read_csv(os.path.join(self.base_path, REFERENCE_FILES[name][0]))
+        if name == 'realisasi_bus':
+            df['tanggal_realisasi'] = pd.to_datetime(df['tanggal_realisasi']).dt.normalize()
+            df['bus_body_no'] = self.standardize_series(df['bus_body_no'])
+        return df
+
+    def load(self, name: str, frames: Dict[str, pd.DataFrame]) -> pd.DataFrame:
+        source_key, content_key = self._cache_key(REFERENCE_FILES[name])
+        cache_file = os.path.join(self.cache_path, f'{name}-{source_key}-{content_key}.parquet')
+
+        if os.path.exists(cache_file):
+            df = pd.read_parquet(cache_file)
+            logger.info(f"Loaded {len(df)} rows of {name} from cache {cache_file}")
+            return df
+
+        df = self._build(name, frames)
+
+        os.makedirs(self.cache_path, exist_ok=True)
+        # Temp file per writer: backfill paralel dengan cache kosong menulis file cache yang sama bersamaan
+        tmp_file = f'{cache_file}.{os.getpid()}-{uuid.uuid4().hex}.tmp'
+        df.to_parquet(tmp_file)
+        os.replace(tmp_file, cache_file)
+
+        # Versi lama dari table yang sama sudah tidak valid; process lain bisa sudah menghapusnya lebih dulu
+        for stale_file in glob.glob(os.path.join(self.cache_path, f'{name}-{source_key}-*.parquet')):
+            if stale_file != cache_file:
+                try:
+                    os.remove(stale_file)
+                except FileNotFoundError:
+                    pass
+
+        logger.info(f"Cached {len(df)} rows of {name} to {cache_file}")
+        return df
+
+    def load_all(self) -> Dict[str, pd.DataFrame]:
+        frames = {}
+        for name in REFERENCE_FILES:
+            frames[name] = self.load(name, frames)
+        return frames
@@ -0,0 +1,155 @@
+import pandas as pd
+import logging
+from typing import Dict, List, Optional
+from concurrency import run_branches
+from schema import fill_missing
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Grain base cube; semua output_by_* diturunkan dari sini dengan group by ulang yang murah
+CUBE_DIMENSIONS = ['tanggal', 'jam', 'card_type', 'tarif', 'route_code', 'route_name', 'shelter_name_var', 'gate_in_boo']
+
+# Satu tap bus bisa cocok dengan lebih dari satu rute realisasi di hari yang sama. *_route menghitung tap per
+# rute yang cocok (seperti join ke realisasi), sedangkan jumlah_pelanggan/total_amount menghitung tap sekali saja
+CUBE_MEASURES = ['jumlah_pelanggan', 'total_amount', 'jumlah_pelanggan_route', 'total_amount_route']
+
+# Dimensi yang memang kosong untuk sebagian row (rute untuk halte, shelter untuk bus)
+NULLABLE_DIMENSIONS = ['route_code', 'route_name', 'shelter_name_var']
+MISSING_DIMENSION = ''
+
+VIEW_MEASURES = ['jumlah_pelanggan', 'total_amount']
+
+# output key -> (dimensi, measure yang dijumlahkan, filter row cube)
+ROLLUP_VIEWS = {
+    'by_card_type': (['tanggal', 'card_type', 'gate_in_boo'], ['jumlah_pelanggan', 'total_amount'], None),
+    'by_route': (
+        ['tanggal', 'route_code', 'route_name', 'gate_in_boo'],
+        ['jumlah_pelanggan_route', 'total_amount_route'],
+        'route_name'
+    ),
+    'by_tarif': (['tanggal', 'tarif', 'gate_in_boo'], ['jumlah_pelanggan', 'total_amount'], None),
+    'by_hour': (['tanggal', 'jam', 'gate_in_boo'], ['jumlah_pelanggan', 'total_amount'], None),
+}
+
+
+# Kolom frame bersih yang dibaca cube; cukup ini yang perlu diambil dari archive untuk agregasi ulang
+TAP_COLUMNS = {
+    'transaksi_bus': ['tanggal', 'waktu_transaksi', 'no_body_var', 'card_type_var', 'fare_int', 'gate_in_boo', 'card_number_var'],
+    'transaksi_halte': ['tanggal', 'waktu_transaksi', 'shelter_name_var', 'card_type_var', 'fare_int', 'gate_in_boo', 'card_number_var'],
+}
+
+BUS_DIMENSIONS = [col for col in CUBE_DIMENSIONS if col != 'shelter_name_var']
+HALTE_DIMENSIONS = [col for col in CUBE_DIMENSIONS if col not in ('route_code', 'route_name')]
+
+
+def _restore_missing(cube: pd.DataFrame) -> pd.DataFrame:
+    # Sentinel dikembalikan jadi NaN, sama seperti dimensi yang memang tidak ada di sumbernya
+    for col in NULLABLE_DIMENSIONS:
+        cube[col] = cube[col].astype(object).mask(cube[col] == MISSING_DIMENSION)
+    return cube
+
+
+def _bus_cube(df_bus: pd.DataFrame, route_lookup: pd.DataFrame) -> pd.DataFrame:
+    df = df_bus[TAP_COLUMNS['transaksi_bus']]
+    # Left join: tap tanpa rute tetap dihitung untuk card type/tarif
+    df = df.join(route_lookup, on=['tanggal', 'no_body_var'], how='left')
+
+    # Index df_bus unik, jadi index yang berulang berarti row tambahan dari rute kedua dst.
+    first_match = ~df.index.duplicated(keep='first')
+    matched = df['route_code'].notna().to_numpy()
+    has_card = df['card_number_var'].notna().to_numpy()
+    fare = df['fare_int'].to_numpy(dtype='int64')
+
+    # Kolom dibiarkan dalam dtype aslinya (category/int32), group by jauh lebih cepat daripada object
+    taps = pd.DataFrame({
+        'tanggal': df['tanggal'],
+        'jam': df['waktu_transaksi'].dt.hour,
+        'card_type': df['card_type_var'],
+        'tarif': df['fare_int'],
+        'route_code': fill_missing(df['route_code'], MISSING_DIMENSION),
+        'route_name': fill_missing(df['route_name'], MISSING_DIMENSION),
+        'gate_in_boo': df['gate_in_boo'],
+        'jumlah_pelanggan': (has_card & first_match).astype('int64'),
+        'total_amount': fare * first_match,
+        'jumlah_pelanggan_route': (has_card & matched).astype('int64'),
+        'total_amount_route': fare * matched,
+    })
+    cube = taps.groupby(BUS_DIMENSIONS, observed=True, sort=False)[CUBE_MEASURES].sum().reset_index()
+    cube['shelter_name_var'] = MISSING_DIMENSION
+    return cube
+
+
+def _halte_cube(df_halte: pd.DataFrame) -> pd.DataFrame:
+    taps = pd.DataFrame({
+        'tanggal': df_halte['tanggal'],
+        'jam': df_halte['waktu_transaksi'].dt.hour,
+        'card_type': df_halte['card_type_var'],
+        'tarif': df_halte['fare_int'],
+        'shelter_name_var': df_halte['shelter_name_var'],
+        'gate_in_boo': df_halte['gate_in_boo'],
+        'jumlah_pelanggan': df_halte['card_number_var'].notna().astype('int64'),
+        'total_amount': df_halte['fare_int'].astype('int64'),
+    })
+    cube = taps.groupby(HALTE_DIMENSIONS, observed=True, sort=False)[['jumlah_pelanggan', 'total_amount']].sum().reset_index()
+    cube['route_code'] = MISSING_DIMENSION
+    cube['route_name'] = MISSING_DIMENSION
+    cube['jumlah_pelanggan_route'] = 0
+    cube['total_amount_route'] = 0
+    return cube
+
+
+def group_cube(df: pd.DataFrame) -> pd.DataFrame:
+    """Group ulang row cube parsial (mode streaming) yang dikumpulkan per tanggal; measure bersifat additive"""
+    # NULL di dimensi rute/shelter diganti sentinel dulu supaya tidak dibuang group by
+    for col in NULLABLE_DIMENSIONS:
+        df[col] = fill_missing(df[col], MISSING_DIMENSION)
+    return _restore_missing(df.groupby(CUBE_DIMENSIONS, observed=True)[CUBE_MEASURES].sum().reset_index())
+
+
+def build_rollup_cube(
+    df_bus: pd.DataFrame,
+    df_halte: pd.DataFrame,
+    route_lookup: pd.DataFrame,
+    max_workers: int = 1
+) -> pd.DataFrame:
+    """Satu kali scan bus + halte yang sudah dibersihkan menjadi base cube"""
+    parts = run_branches({
+        'bus': lambda: _bus_cube(df_bus, route_lookup),
+        'halte': lambda: _halte_cube(df_halte),
+    }, max_workers)
+
+    # Bus tidak punya shelter dan halte tidak punya rute, jadi kedua cube tidak pernah berbagi grup
+    columns = CUBE_DIMENSIONS + CUBE_MEASURES
+    cube = _restore_missing(pd.concat([parts['bus'][columns], parts['halte'][columns]], ignore_index=True))
+    logger.info(f"Rollup cube: {len(cube)} rows from {len(df_bus) + len(df_halte)} taps")
+    return cube
+
+
+def fold_views(running: Optional[Dict[str, pd.DataFrame]], partial: Dict[str, pd.DataFrame]) -> Dict[str, pd.DataFrame]:
+    """Gabungkan output_by_* parsial per chunk (mode streaming); grain view kecil, jadi concat + group by ulang murah"""
+    if running is None:
+        return partial
+    folded = {}
+    for key, view in partial.items():
+        dimensions = [col for col in view.columns if col not in VIEW_MEASURES]
+        folded[key] = pd.concat([running[key], view], ignore_index=True).groupby(
+            dimensions, observed=True
+        )[VIEW_MEASURES].sum().reset_index()
+    return folded
+
+
+def derive_view(cube: pd.DataFrame, dimensions: List[str], measures: List[str], required: Optional[str] = None) -> pd.DataFrame:
+    if required is not None:
+        cube = cube[cube[required].notna()]
+    view = cube.groupby(dimensions, observed=True)[measures].sum().reset_index()
+    view.columns = dimensions + VIEW_MEASURES
+    return view
+
+
+def derive_outputs(cube: pd.DataFrame) -> Dict[str, pd.DataFrame]:
+    outputs = {}
+    for key, (dimensions, measures, required) in ROLLUP_VIEWS.items():
+        outputs[key] = derive_view(cube, dimensions, measures, required)
+        logger.info(f"{key} derived from cube: {len(outputs[key])} rows")
+    return outputs
@@ -0,0 +1,64 @@
+import pandas as pd
+import logging
+from typing import List
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Kolom dengan sedikit nilai unik disimpan sebagai category
+CATEGORY_COLUMNS = ['card_type_var', 'status_var', 'no_body_var', 'shelter_name_var', 'terminal_name_var']
+
+# Kolom teks high-cardinality disimpan di buffer Arrow, bukan object Python per row
+STRING_COLUMNS = ['uuid', 'card_number_var', 'armada_id_var', 'transcode_txt']
+
+# Nilai uang; hanya di-cast kalau tidak ada NULL, sisanya setelah fillna di transform
+INT32_COLUMNS = ['balance_before_int', 'fare_int', 'balance_after_int']
+
+
+def memory_usage_mb(df: pd.DataFrame) -> float:
+    return df.memory_usage(deep=True).sum() / 1024 ** 2
+
+
+def fill_missing(series: pd.Series, value) -> pd.Series:
+    """fillna yang juga aman untuk kolom category (nilai pengganti ditambahkan ke categories dulu)"""
+    if isinstance(series.dtype, pd.CategoricalDtype) and value not in series.cat.categories:
+        series = series.cat.add_categories([value])
+    return series.fillna(value)
+
+
+def concat_compacted(frames: List[pd.DataFrame]) -> pd.DataFrame:
+    """pd.concat untuk chunk hasil apply_transaksi_schema; categories disamakan dulu supaya kolom category tidak jadi object"""
+    if len(frames) > 1:
+        for col in CATEGORY_COLUMNS:
+            if col in frames[0].columns:
+                # Chunk yang kolomnya NULL semua punya categories kosong bertipe lain, jadi tidak lewat union_categoricals
+                categories = pd.unique(pd.Series([value for df in frames for value in df[col].cat.categories], dtype=object))
+                for df in frames:
+                    df[col] = df[col].cat.set_categories(categories)
+    return pd.concat(frames, ignore_index=True)
+
+
+def apply_transaksi_schema(df: pd.DataFrame, label: str = 'frame', report_memory: bool = True) -> pd.DataFrame:
+    if report_memory:
+        memory_before = memory_usage_mb(df)
+
+    dtypes = {}
+    for col in CATEGORY_COLUMNS:
+        if col in df.columns:
+            dtypes[col] = 'category'
+    for col in STRING_COLUMNS:
+        if col in df.columns:
+            dtypes[col] = 'string[pyarrow]'
+    for col in INT32_COLUMNS:
+        if col in df.columns and not df[col].isna().any():
+            dtypes[col] = 'int32'
+    df = df.astype(dtypes)
+
+    if report_memory:
+        memory_after = memory_usage_mb(df)
+        logger.info(
+            f"Compacted {label}: {memory_before:.2f} MB -> {memory_after:.2f} MB "
+            f"({(1 - memory_after / max(memory_before, 1e-9)) * 100:.1f}% smaller)"
+        )
+
+    return df
@@ -0,0 +1,276 @@
+import pandas as pd
+import io
+import logging
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+from datetime import date
+from partitioning import tanggal_range_filter
+from corridor import ShelterCorridorIndex
+from geo_grid import GRID_CELL_DEGREES
+from dedup_index import DEDUP_INDEX_LOCK, REGISTER_UUIDS_QUERY, STALE_UUIDS_QUERY, UUID_HASH_EXPRESSION, preferred_row_order
+from reference_cache import build_shelter_index
+from load import OUTPUT_TABLES, STALE_ROW_CONDITION, upsert_clause
+from typing import Callable, Dict, List, Optional
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+OUTPUT_KEYS = {table_name: key_columns for table_name, key_columns in OUTPUT_TABLES.values()}
+
+REFERENCE_TABLES = {
+    'routes': ('ref_routes', ['route_code', 'route_name']),
+    'realisasi_bus': ('ref_realisasi_bus', ['tanggal_realisasi', 'bus_body_no', 'rute_realisasi']),
+    'shelter_corridor': ('ref_shelter_corridor', ['shelter_name_var', 'corridor_code', 'corridor_name']),
+}
+
+# table output -> (kolom yang diisi, SELECT agregasi dari tmp_pelanggan)
+OUTPUT_QUERIES = {
+    'output_by_card_type': (['tanggal', 'card_type', 'gate_in_boo', 'jumlah_pelanggan', 'total_amount'], """
+        SELECT tanggal, card_type_var, gate_in_boo, COUNT(card_number_var), SUM(fare_int)
+        FROM tmp_pelanggan
+        GROUP BY tanggal, card_type_var, gate_in_boo
+    """),
+    'output_by_route': (['tanggal', 'route_code', 'route_name', 'gate_in_boo', 'jumlah_pelanggan', 'total_amount'], """
+        SELECT p.tanggal, r.route_code, r.route_name, p.gate_in_boo, COUNT(p.card_number_var), SUM(p.fare_int)
+        FROM tmp_pelanggan p
+        JOIN ref_realisasi_bus rb
+          ON rb.tanggal_realisasi = p.tanggal AND rb.bus_body_no = p.no_body_var
+        JOIN ref_routes r
+          ON r.route_code = rb.rute_realisasi
+        WHERE p.source = 'bus' AND r.route_name IS NOT NULL
+        GROUP BY p.tanggal, r.route_code, r.route_name, p.gate_in_boo
+    """),
+    'output_by_tarif': (['tanggal', 'tarif', 'gate_in_boo', 'jumlah_pelanggan', 'total_amount'], """
+        SELECT tanggal, fare_int, gate_in_boo, COUNT(card_number_var), SUM(fare_int)
+        FROM tmp_pelanggan
+        GROUP BY tanggal, fare_int, gate_in_boo
+    """),
+    'output_by_hour': (['tanggal', 'jam', 'gate_in_boo', 'jumlah_pelanggan', 'total_amount'], """
+        SELECT tanggal, jam, gate_in_boo, COUNT(card_number_var), SUM(fare_int)
+        FROM tmp_pelanggan
+        GROUP BY tanggal, jam, gate_in_boo
+    """),
+    # Binning sama dengan geo_grid.grid_indices (operasi float8 yang sama, jadi index sel identik)
+    'output_by_grid_cell': (['tanggal', 'lat_index', 'lon_index', 'gate_in_boo', 'jumlah_pelanggan', 'total_amount'], f"""
+        SELECT tanggal,
+               floor((p_latitude_flo + 90) / {GRID_CELL_DEGREES}::float8)::int AS lat_index,
+               floor((p_longitude_flo + 180) / {GRID_CELL_DEGREES}::float8)::int AS lon_index,
+               gate_in_boo, COUNT(card_number_var), SUM(fare_int)
+        FROM tmp_pelanggan
+        WHERE p_latitude_flo BETWEEN -90 AND 90 AND p_longitude_flo BETWEEN -180 AND 180
+        GROUP BY 1, 2, 3, gate_in_boo
+    """),
+    # tmp_shelter_corridor berisi hasil ShelterCorridorIndex per nama shelter unik, termasuk hasil fuzzy match
+    'output_by_corridor': (['tanggal', 'corridor_code', 'corridor_name', 'gate_in_boo', 'jumlah_pelanggan', 'total_amount'], """
+        SELECT p.tanggal, sc.corridor_code, sc.corridor_name, p.gate_in_boo, COUNT(p.card_number_var), SUM(p.fare_int)
+        FROM tmp_pelanggan p
+        JOIN tmp_shelter_corridor sc
+          ON sc.shelter_name_var = p.shelter_name_var
+        WHERE p.source = 'halte'
+        GROUP BY p.tanggal, sc.corridor_code, sc.corridor_name, p.gate_in_boo
+    """),
+    # Sama dengan rollup.build_rollup_cube: tap bus yang cocok dengan beberapa rute dihitung sekali untuk
+    # jumlah_pelanggan/total_amount (match_rank = 1) dan sekali per rute untuk measure *_route
+    'output_rollup_cube': ([
+        'tanggal', 'jam', 'card_type', 'tarif', 'route_code', 'route_name', 'shelter_name_var', 'gate_in_boo',
+        'jumlah_pelanggan', 'total_amount', 'jumlah_pelanggan_route', 'total_amount_route'
+    ], """
+        SELECT tanggal, jam, card_type_var, fare_int, route_code, route_name, shelter_name_var, gate_in_boo,
+               COUNT(card_number_var) FILTER (WHERE match_rank = 1),
+               COALESCE(SUM(fare_int) FILTER (WHERE match_rank = 1), 0),
+               COUNT(card_number_var) FILTER (WHERE route_code IS NOT NULL),
+               COALESCE(SUM(fare_int) FILTER (WHERE route_code IS NOT NULL), 0)
+        FROM (
+            SELECT p.tanggal, p.jam, p.card_type_var, p.fare_int, p.shelter_name_var, p.gate_in_boo,
+                   p.card_number_var, r.route_code, r.route_name,
+                   ROW_NUMBER() OVER (PARTITION BY p.ctid) AS match_rank
+            FROM tmp_pelanggan p
+            LEFT JOIN (ref_realisasi_bus rb JOIN ref_routes r ON r.route_code = rb.rute_realisasi)
+              ON p.source = 'bus' AND rb.tanggal_realisasi = p.tanggal AND rb.bus_body_no = p.no_body_var
+        ) AS matched
+        GROUP BY tanggal, jam, card_type_var, fare_int, route_code, route_name, shelter_name_var, gate_in_boo
+    """),
+}
+
+
+class SqlAggregationEngine:
+    """Agregasi dijalankan di PostgreSQL: filter, dedup, join, dan group by tanpa memindahkan row ke worker"""
+
+    def __init__(self, engine: Engine, standardize_series: Callable[[pd.Series], pd.Series]):
+        self.engine = engine
+        self.standardize_series = standardize_series
+        self.corridor_index: Optional[ShelterCorridorIndex] = None
+
+    def load_reference_data(self, reference_data: Dict[str, pd.DataFrame]):
+        df_realisasi = reference_data['realisasi_bus'].copy()
+        df_realisasi['tanggal_realisasi'] = pd.to_datetime(df_realisasi['tanggal_realisasi']).dt.date
+        df_realisasi['bus_body_no'] = self.standardize_series(df_realisasi['bus_body_no'])
+        frames = {**reference_data, 'realisasi_bus': df_realisasi}
+
+        shelter_index = reference_data.get('shelter_index')
+        if shelter_index is None:
+            shelter_index = build_shelter_index(reference_data['shelter_corridor'])
+        self.corridor_index = ShelterCorridorIndex(shelter_index)
+
+        conn = self.engine.raw_connection()
+        try:
+            cursor = conn.cursor()
+            for key, (table_name, columns) in REFERENCE_TABLES.items():
+                buffer = io.StringIO()
+                frames[key][columns].to_csv(buffer, index=False, header=False)
+                buffer.seek(0)
+
+                cursor.execute(f'TRUNCATE {table_name}')
+                cursor.copy_expert(
+                    f"COPY {table_name} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv)", buffer
+                )
+                logger.info(f"Loaded {cursor.rowcount} rows to {table_name}")
+
+            cursor.execute(f"ANALYZE {', '.join(table_name for table_name, _ in REFERENCE_TABLES.values())}")
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            conn.close()
+
+    def _pelanggan_query(
+        self,
+        table_name: str,
+        source: str,
+        no_body_expression: str,
+        shelter_expression: str,
+        where_clause: str,
+        index_aware: bool = False
+    ) -> str:
+        # Urutan sama dengan pandas: dedup uuid dulu, baru filter status 'S'
+        registered_join, preferred_order = preferred_row_order(table_name, index_aware)
+        return f"""
+            SELECT '{source}' AS source, uuid, waktu_transaksi, tanggal, jam, no_body_var, shelter_name_var,
+                   card_number_var, card_type_var, fare_int, gate_in_boo, p_latitude_flo, p_longitude_flo
+            FROM (
+                SELECT DISTINCT ON (uuid)
+                       uuid,
+                       waktu_transaksi,
+                       waktu_transaksi::date AS tanggal,
+                       EXTRACT(HOUR FROM waktu_transaksi)::int AS jam,
+                       {no_body_expression} AS no_body_var,
+                       {shelter_expression} AS shelter_name_var,
+                       card_number_var,
+                       COALESCE(card_type_var, 'UNKNOWN') AS card_type_var,
+                       COALESCE(fare_int, 0) AS fare_int,
+                       gate_in_boo,
+                       p_latitude_flo,
+                       p_longitude_flo,
+                       status_var
+                FROM {table_name}
+                {registered_join}
+                {where_clause}
+                ORDER BY uuid, {preferred_order}
+            ) AS deduped
+            WHERE status_var = 'S' AND tanggal IS NOT NULL AND gate_in_boo IS NOT NULL
+        """
+
+    def _create_shelter_corridor_table(self, conn):
+        """Koridor untuk nama shelter yang ada di tmp_pelanggan, di-resolve di Python supaya fuzzy match sama dengan engine pandas"""
+        if self.corridor_index is None:
+            raise RuntimeError("load_reference_data must be called before aggregate")
+
+        shelter_names = conn.execute(text(
+            "SELECT DISTINCT shelter_name_var FROM tmp_pelanggan WHERE source = 'halte'"
+        )).scalars().all()
+        corridors = self.corridor_index.resolve(shelter_names).dropna(subset=['corridor_code']).reset_index()
+
+        conn.execute(text("""
+            CREATE TEMP TABLE tmp_shelter_corridor (
+                shelter_name_var TEXT PRIMARY KEY,
+                corridor_code VARCHAR(50),
+                corridor_name VARCHAR(255)
+            ) ON COMMIT DROP
+        """))
+        if len(corridors):
+            conn.execute(
+                text('INSERT INTO tmp_shelter_corridor VALUES (:shelter_name_var, :corridor_code, :corridor_name)'),
+                corridors.to_dict('records')
+            )
+        logger.info(f"Matched {len(corridors)} of {len(shelter_names)} shelters to corridors")
+
+    def _delete_affected(self, conn, table_name: str, tanggal_list: Optional[List[date]], condition: str = 'true'):
+        if tanggal_list is None:
+            return conn.execute(text(
+                f'DELETE FROM {table_name} WHERE tanggal IN (SELECT DISTINCT tanggal FROM tmp_pelanggan) AND {condition}'
+            ))
+        return conn.execute(
+            text(f'DELETE FROM {table_name} WHERE tanggal = ANY(:tanggal_list) AND {condition}'),
+            {'tanggal_list': list(tanggal_list)}
+        )
+
+    def aggregate(
+        self,
+        tanggal_list: Optional[List[date]] = None,
+        cross_run_dedup: bool = False,
+        load_mode: str = 'replace'
+    ) -> Dict[str, int]:
+        """load_mode sama dengan DataLoader: 'replace' hapus lalu insert, 'upsert' ON CONFLICT lalu hapus grup basi"""
+        if load_mode not in ('replace', 'upsert'):
+            raise ValueError(f"Unknown load mode: {load_mode}")
+
+        logger.info("Starting SQL aggregation...")
+
+        params = {}
+        where_clause = ''
+        if tanggal_list is not None:
+            where_clause = 'WHERE false'
+            if tanggal_list:
+                range_filter, params = tanggal_range_filter(tanggal_list)
+                where_clause = f'WHERE {range_filter}'
+
+        row_counts = {}
+        with self.engine.begin() as conn:
+            conn.execute(text(f"""
+                CREATE TEMP TABLE tmp_pelanggan ON COMMIT DROP AS
+                {self._pelanggan_query(
+                    'dummy_transaksi_bus', 'bus', 'standardize_no_body(no_body_var)', 'NULL::text', where_clause,
+                    cross_run_dedup
+                )}
+                UNION ALL
+                {self._pelanggan_query(
+                    'dummy_transaksi_halte', 'halte', 'NULL::text', "COALESCE(shelter_name_var, 'UNKNOWN')", where_clause,
+                    cross_run_dedup
+                )}
+            """), params)
+            if cross_run_dedup:
+                # Aturan yang sama dengan UuidDedupIndex.filter_processed, dijalankan langsung di database.
+                # Lock dipegang sampai commit, karena uuid yang dicatat baru terlihat run lain setelah commit
+                conn.execute(text(DEDUP_INDEX_LOCK))
+                stale = conn.execute(text(f"""
+                    DELETE FROM tmp_pelanggan
+                    WHERE uuid IN ({STALE_UUIDS_QUERY.format(
+                        batch_table='tmp_pelanggan', hash_expression=UUID_HASH_EXPRESSION
+                    )})
+                """))
+                registered = conn.execute(text(REGISTER_UUIDS_QUERY.format(
+                    batch_table='tmp_pelanggan', hash_expression=UUID_HASH_EXPRESSION
+                )))
+                logger.info(
+                    f"Dedup index: dropped {stale.rowcount} taps already processed in earlier runs, "
+                    f"{registered.rowcount} new uuids registered"
+                )
+            conn.execute(text('ANALYZE tmp_pelanggan'))
+            self._create_shelter_corridor_table(conn)
+
+            for table_name, (columns, select_query) in OUTPUT_QUERIES.items():
+                insert_query = f"INSERT INTO {table_name} ({', '.join(columns)}) {select_query}"
+                if load_mode == 'replace':
+                    deleted = self._delete_affected(conn, table_name, tanggal_list)
+                    inserted = conn.execute(text(insert_query))
+                else:
+                    inserted = conn.execute(text(f'{insert_query} {upsert_clause(columns, OUTPUT_KEYS[table_name])}'))
+                    deleted = self._delete_affected(conn, table_name, tanggal_list, STALE_ROW_CONDITION)
+                row_counts[table_name] = inserted.rowcount
+                logger.info(
+                    f"Wrote {inserted.rowcount} rows to {table_name} ({load_mode}), deleted {deleted.rowcount} rows"
+                )
+
+        logger.info("SQL aggregation completed successfully")
+        return row_counts
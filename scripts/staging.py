@@ -0,0 +1,147 @@
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+import logging
+import os
+import re
+import shutil
+import uuid
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+from archive import PARTITIONING
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+STAGING_PATH = '/opt/airflow/data/staging'
+
+# Direktori run yang tertinggal (run gagal sebelum load selesai) dihapus maintain_partitions setelah N hari
+STAGING_RETENTION_DAYS = 7
+
+
+class StagingArea:
+    """Artifact Parquet per DAG run, supaya antar task cukup bertukar path lewat XCom"""
+
+    def __init__(self, run_id: str, base_path: str = STAGING_PATH):
+        self.run_id = run_id
+        self.run_path = os.path.join(base_path, re.sub(r'[^A-Za-z0-9_.-]', '_', run_id))
+
+    def write(self, name: str, df: pd.DataFrame) -> str:
+        os.makedirs(self.run_path, exist_ok=True)
+
+        path = os.path.join(self.run_path, f'{name}.parquet')
+        tmp_path = f'{path}.tmp'
+
+        # Tulis ke file sementara dulu agar retry task tidak membaca artifact setengah jadi
+        # Index ikut disimpan supaya frame yang sudah di-index (misalnya route_lookup) tetap siap dipakai
+        df.to_parquet(tmp_path)
+        os.replace(tmp_path, path)
+
+        logger.info(f"Staged {len(df)} rows to {path}")
+        return path
+
+    def write_all(self, dataframes: Dict[str, pd.DataFrame]) -> Dict[str, str]:
+        return {name: self.write(name, df) for name, df in dataframes.items()}
+
+    def remove(self):
+        """Hapus semua artifact run ini; dipanggil setelah output tersimpan"""
+        if os.path.isdir(self.run_path):
+            shutil.rmtree(self.run_path)
+            logger.info(f"Removed staged artifacts at {self.run_path}")
+
+    @staticmethod
+    def prune_before(cutoff: datetime, base_path: str = STAGING_PATH) -> List[str]:
+        """Hapus direktori run yang terakhir diubah sebelum cutoff (sisa run yang gagal atau dibatalkan)"""
+        removed = []
+        if not os.path.isdir(base_path):
+            return removed
+
+        for run_dir in sorted(os.listdir(base_path)):
+            run_path = os.path.join(base_path, run_dir)
+            if os.path.isdir(run_path) and datetime.fromtimestamp(os.path.getmtime(run_path)) < cutoff:
+                shutil.rmtree(run_path)
+                removed.append(run_dir)
+
+        logger.info(f"Removed {len(removed)} staging run directories last modified before {cutoff} from {base_path}")
+        return removed
+
+    def artifact_path(self, name: str) -> str:
+        return os.path.join(self.run_path, name)
+
+    def reset_partitioned(self, name: str) -> str:
+        """Hapus artifact partisi sisa attempt sebelumnya, supaya retry task tidak menghitung chunk dua kali"""
+        path = self.artifact_path(name)
+        if os.path.isdir(path):
+            shutil.rmtree(path)
+        return path
+
+    @staticmethod
+    def _arrow_table(df: pd.DataFrame) -> pa.Table:
+        # Kolom teks ditulis sebagai string Arrow: category dan kolom object yang NULL semua akan bertipe lain
+        # di tiap file dan bentrok saat partisi dibaca sebagai satu dataset
+        text_columns = [
+            col for col in df.columns
+            if df[col].dtype == object or isinstance(df[col].dtype, pd.CategoricalDtype)
+        ]
+        return pa.Table.from_pandas(df.astype({col: 'string[pyarrow]' for col in text_columns}), preserve_index=False)
+
+    def append_partitioned(self, name: str, df: pd.DataFrame) -> int:
+        """Tambahkan frame ke artifact yang dipartisi per tanggal tanpa membaca isi yang sudah ada"""
+        if df.empty:
+            return 0
+
+        ds.write_dataset(
+            self._arrow_table(df.assign(tanggal=df['tanggal'].dt.date)),
+            self.artifact_path(name),
+            format='parquet',
+            partitioning=PARTITIONING,
+            basename_template=f'part-{uuid.uuid4().hex}-{{i}}.parquet',
+            existing_data_behavior='overwrite_or_ignore'
+        )
+        return len(df)
+
+    def fold_partitioned(self, name: str, fold: Callable[[pd.DataFrame], pd.DataFrame]) -> Optional[str]:
+        """Ringkas setiap partisi tanggal menjadi satu file lewat fold; hanya satu partisi yang dibaca ke memory.
+
+        None jika belum ada row yang di-append.
+        """
+        path = self.artifact_path(name)
+        partitions = sorted(os.listdir(path)) if os.path.isdir(path) else []
+        if not partitions:
+            return None
+
+        rows = 0
+        for partition in partitions:
+            partition_path = os.path.join(path, partition)
+            part_files = os.listdir(partition_path)
+            df = ds.dataset(partition_path, format='parquet').to_table().to_pandas()
+            df.insert(0, 'tanggal', pd.Timestamp(partition.split('=', 1)[1]))
+
+            # Kolom tanggal tetap di nama direktori; file lama baru dihapus setelah hasil fold tertulis
+            folded = fold(df).drop(columns='tanggal')
+            tmp_path = os.path.join(partition_path, 'folded.parquet.tmp')
+            pq.write_table(self._arrow_table(folded), tmp_path)
+            for part_file in part_files:
+                os.remove(os.path.join(partition_path, part_file))
+            os.replace(tmp_path, os.path.join(partition_path, 'part-0.parquet'))
+            rows += len(folded)
+
+        logger.info(f"Folded {len(partitions)} partitions of {name} to {rows} rows at {path}")
+        return path
+
+    @staticmethod
+    def read(path: str) -> pd.DataFrame:
+        if os.path.isdir(path):
+            # Artifact partisi: tanggal dari nama direktori dikembalikan jadi kolom datetime pertama
+            df = ds.dataset(path, format='parquet', partitioning=PARTITIONING).to_table().to_pandas()
+            tanggal = pd.to_datetime(df.pop('tanggal'))
+            df.insert(0, 'tanggal', tanggal)
+        else:
+            df = pd.read_parquet(path)
+        logger.info(f"Read {len(df)} rows from staged artifact {path}")
+        return df
+
+    @staticmethod
+    def read_all(paths: Dict[str, str]) -> Dict[str, pd.DataFrame]:
+        return {name: StagingArea.read(path) for name, path in paths.items()}
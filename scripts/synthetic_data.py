@@ -0,0 +1,229 @@
+import pandas as pd
+import numpy as np
+import argparse
+import logging
+import os
+import shutil
+from datetime import date
+from typing import Dict
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+BUS_PREFIXES = ['KLG', 'LGS', 'PTK', 'NBR', 'BRT', 'TWS']
+
+# Variasi penulisan no body seperti di dummy_transaksi_bus.csv, dengan proporsi yang kurang lebih sama
+NO_BODY_SUFFIXES = ['', '-', 'B', 'A', '_', '-B', '_B', '_A', '-A']
+NO_BODY_SUFFIX_WEIGHTS = [0.27, 0.14, 0.12, 0.11, 0.11, 0.08, 0.07, 0.06, 0.04]
+
+CARD_TYPES = ['BRIZZI', 'JakCard', 'E-Money', 'Flazz']
+FARES = [20000, 35000, 2000, 3500]
+
+BUS_COLUMNS = [
+    'uuid', 'waktu_transaksi', 'armada_id_var', 'no_body_var', 'card_number_var', 'card_type_var',
+    'balance_before_int', 'fare_int', 'balance_after_int', 'transcode_txt', 'gate_in_boo',
+    'p_latitude_flo', 'p_longitude_flo', 'status_var', 'free_service_boo', 'insert_on_dtm'
+]
+HALTE_COLUMNS = [
+    'uuid', 'waktu_transaksi', 'shelter_name_var', 'terminal_name_var', 'card_number_var', 'card_type_var',
+    'balance_before_int', 'fare_int', 'balance_after_int', 'transcode_txt', 'gate_in_boo',
+    'p_latitude_flo', 'p_longitude_flo', 'status_var', 'free_service_boo', 'insert_on_dtm'
+]
+
+
+class SyntheticDataGenerator:
+    """Versi besar dari dummy CSV dengan format no body, duplikat uuid, NULL, dan status yang sama berantakannya"""
+
+    def __init__(
+        self,
+        reference_path: str = '/opt/airflow/data/input',
+        start_date: date = date(2025, 7, 1),
+        days: int = 31,
+        fleet_size: int = 3000,
+        duplicate_rate: float = 0.01,
+        null_rate: float = 0.02,
+        seed: int = 42
+    ):
+        self.reference_path = reference_path
+        self.start = pd.Timestamp(start_date)
+        self.days = days
+        self.duplicate_rate = duplicate_rate
+        self.null_rate = null_rate
+        self.rng = np.random.default_rng(seed)
+
+        self.routes = pd.read_csv(f'{reference_path}/dummy_routes.csv', dtype=str)['route_code'].to_numpy()
+        self.shelters = pd.read_csv(f'{reference_path}/dummy_shelter_corridor.csv')['shelter_name_var'].to_numpy()
+
+        # Armada tetap: setiap bus punya prefix, nomor, dan plat sendiri
+        # Kombinasi prefix + nomor unik supaya satu no body standar tidak dipakai dua bus
+        fleet_ids = self.rng.choice(len(BUS_PREFIXES) * 9990, fleet_size, replace=False)
+        self.fleet_prefix = np.array(BUS_PREFIXES)[fleet_ids // 9990]
+        self.fleet_number = (fleet_ids % 9990 + 10).astype(str)
+        self.fleet_plate = np.array([
+            f'B {number} {letters}' for number, letters in zip(
+                self.rng.integers(1000, 10000, fleet_size),
+                [''.join(chars) for chars in self.rng.choice(list('ABCDEFGHIJKLMNOPQRSTUVWXYZ'), (fleet_size, 3))]
+            )
+        ])
+        self.fleet_days_seen = np.zeros((days, fleet_size), dtype=bool)
+        self.transcode_counter = 0
+
+    def _uuids(self, n: int) -> np.ndarray:
+        # uuid4 dibuat vectorized dari random bytes, jauh lebih cepat dari uuid.uuid4() per row
+        hex_digits = np.frombuffer(self.rng.bytes(16 * n).hex().encode(), dtype=np.uint8).reshape(n, 32).copy()
+        hex_digits[:, 12] = ord('4')
+        hex_digits[:, 16] = np.frombuffer(b'89ab', dtype=np.uint8)[self.rng.integers(0, 4, n)]
+        out = np.full((n, 36), ord('-'), dtype=np.uint8)
+        for start, end, target in ((0, 8, 0), (8, 12, 9), (12, 16, 14), (16, 20, 19), (20, 32, 24)):
+            out[:, target:target + end - start] = hex_digits[:, start:end]
+        return out.view('S36').ravel().astype(str)
+
+    def _messy_no_body(self, bus_index: np.ndarray) -> np.ndarray:
+        suffix = self.rng.choice(NO_BODY_SUFFIXES, len(bus_index), p=NO_BODY_SUFFIX_WEIGHTS)
+        return np.char.add(np.char.add(self.fleet_prefix[bus_index], self.fleet_number[bus_index]), suffix)
+
+    def no_body_values(self, n: int) -> pd.Series:
+        """n no body tap bus dengan variasi penulisan dan NULL seperti bus_chunk, tanpa kolom lain"""
+        values = pd.Series(self._messy_no_body(self.rng.integers(0, len(self.fleet_prefix), n)), dtype=object)
+        return values.mask(self.rng.random(n) < self.null_rate)
+
+    def _common_columns(self, n: int) -> pd.DataFrame:
+        waktu = self.start + pd.to_timedelta(self.rng.integers(0, self.days * 86400, n), unit='s')
+        free_service = self.rng.random(n) < 0.12
+        fare = np.where(free_service, 0, self.rng.choice(FARES, n))
+        balance_before = fare + self.rng.integers(0, 100, n) * 1000
+
+        transcode = np.arange(self.transcode_counter + 1, self.transcode_counter + n + 1)
+        self.transcode_counter += n
+
+        return pd.DataFrame({
+            'uuid': self._uuids(n),
+            'waktu_transaksi': waktu,
+            'card_number_var': pd.Series(self.rng.integers(0, 10 ** 16, n)).astype(str).str.zfill(16).to_numpy(),
+            'card_type_var': self.rng.choice(CARD_TYPES, n),
+            'balance_before_int': balance_before,
+            'fare_int': fare,
+            'balance_after_int': balance_before - fare,
+            'transcode_txt': 'TX' + pd.Series(transcode).astype(str).str.zfill(6),
+            'gate_in_boo': self.rng.random(n) < 0.5,
+            'p_latitude_flo': self.rng.uniform(-6.25, -6.15, n),
+            'p_longitude_flo': self.rng.uniform(106.75, 106.85, n),
+            'free_service_boo': free_service,
+            'insert_on_dtm': waktu + pd.to_timedelta(self.rng.integers(1, 120, n), unit='s'),
+        })
+
+    def _add_nulls_and_duplicates(self, df: pd.DataFrame, nullable_columns) -> pd.DataFrame:
+        n = len(df)
+        for col in nullable_columns:
+            mask = self.rng.random(n) < self.null_rate
+            series = df[col].astype('Int64') if pd.api.types.is_integer_dtype(df[col]) else df[col]
+            df[col] = series.mask(mask)
+
+        # Duplikat uuid = tap yang terkirim ulang, seluruh row sama dengan row sebelumnya
+        duplicate_count = int(n * self.duplicate_rate)
+        if duplicate_count and n > 1:
+            take = np.arange(n)
+            positions = self.rng.choice(np.arange(1, n), duplicate_count, replace=False)
+            take[positions] = (positions * self.rng.random(duplicate_count)).astype(np.int64)
+            df = df.take(take).reset_index(drop=True)
+        return df
+
+    def bus_chunk(self, n: int) -> pd.DataFrame:
+        df = self._common_columns(n)
+        bus_index = self.rng.integers(0, len(self.fleet_prefix), n)
+        day_index = ((df['waktu_transaksi'] - self.start).dt.days).to_numpy()
+        self.fleet_days_seen[day_index, bus_index] = True
+
+        df['armada_id_var'] = self.fleet_plate[bus_index]
+        df['no_body_var'] = self._messy_no_body(bus_index)
+        df['status_var'] = np.where(self.rng.random(n) < 0.95, 'S', 'F')
+
+        df = self._add_nulls_and_duplicates(df, ['no_body_var', 'card_type_var', 'fare_int'])
+        return df[BUS_COLUMNS]
+
+    def halte_chunk(self, n: int) -> pd.DataFrame:
+        df = self._common_columns(n)
+        shelter = self.rng.choice(self.shelters, n)
+        gate = self.rng.integers(1, 4, n).astype(str)
+
+        df['shelter_name_var'] = shelter
+        df['terminal_name_var'] = np.char.add(np.char.add(np.char.add('Gate ', gate), ' '), shelter.astype(str))
+        df['status_var'] = np.where(self.rng.random(n) < 0.87, 'S', 'F')
+
+        df = self._add_nulls_and_duplicates(df, ['shelter_name_var', 'card_type_var', 'fare_int'])
+        return df[HALTE_COLUMNS]
+
+    def realisasi(self) -> pd.DataFrame:
+        """Satu row per bus per hari operasi; no body ditulis dengan variasi yang bisa berbeda dari tap-nya"""
+        day_index, bus_index = np.nonzero(self.fleet_days_seen)
+        tanggal = self.start + pd.to_timedelta(day_index, unit='D')
+        return pd.DataFrame({
+            'tanggal_realisasi': (
+                tanggal.month.astype(str) + '/' + tanggal.day.astype(str) + '/' + tanggal.year.astype(str)
+            ),
+            'bus_body_no': self._messy_no_body(bus_index),
+            'rute_realisasi': self.rng.choice(self.routes, len(bus_index)),
+        })
+
+    def _write_chunks(self, path: str, rows: int, chunk_rows: int, make_chunk) -> int:
+        written = 0
+        with open(path, 'w', newline='') as csv_file:
+            while written < rows:
+                n = min(chunk_rows, rows - written)
+                chunk = make_chunk(n)
+                chunk.to_csv(csv_file, index=False, header=written == 0)
+                written += n
+        return written
+
+    def generate(self, output_path: str, bus_rows: int, halte_rows: int, chunk_rows: int = 1000000) -> Dict[str, str]:
+        """Tulis satu folder input lengkap (transaksi + reference) yang bisa dipakai sebagai base_path pipeline"""
+        os.makedirs(output_path, exist_ok=True)
+        paths = {}
+
+        paths['transaksi_bus'] = f'{output_path}/dummy_transaksi_bus.csv'
+        self._write_chunks(paths['transaksi_bus'], bus_rows, chunk_rows, self.bus_chunk)
+        logger.info(f"Generated {bus_rows} rows to {paths['transaksi_bus']}")
+
+        paths['transaksi_halte'] = f'{output_path}/dummy_transaksi_halte.csv'
+        self._write_chunks(paths['transaksi_halte'], halte_rows, chunk_rows, self.halte_chunk)
+        logger.info(f"Generated {halte_rows} rows to {paths['transaksi_halte']}")
+
+        paths['realisasi_bus'] = f'{output_path}/dummy_realisasi_bus.csv'
+        df_realisasi = self.realisasi()
+        df_realisasi.to_csv(paths['realisasi_bus'], index=False)
+        logger.info(f"Generated {len(df_realisasi)} rows to {paths['realisasi_bus']}")
+
+        for name in ('dummy_routes.csv', 'dummy_shelter_corridor.csv'):
+            if os.path.realpath(self.reference_path) != os.path.realpath(output_path):
+                shutil.copy(f'{self.reference_path}/{name}', f'{output_path}/{name}')
+
+        return paths
+
+
+def split_rows(total_rows: int) -> Dict[str, int]:
+    # Perbandingan bus : halte mengikuti dummy CSV (515 : 900)
+    bus_rows = int(total_rows * 515 / 1415)
+    return {'bus_rows': bus_rows, 'halte_rows': total_rows - bus_rows}
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Generate dummy transaksi CSV dalam skala besar')
+    parser.add_argument('--output', required=True)
+    parser.add_argument('--rows', type=int, required=True, help='Total tap bus + halte')
+    parser.add_argument('--reference-path', default='/opt/airflow/data/input')
+    parser.add_argument('--days', type=int, default=31)
+    parser.add_argument('--fleet-size', type=int, default=3000)
+    parser.add_argument('--duplicate-rate', type=float, default=0.01)
+    parser.add_argument('--null-rate', type=float, default=0.02)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    generator = SyntheticDataGenerator(
+        args.reference_path,
+        days=args.days,
+        fleet_size=args.fleet_size,
+        duplicate_rate=args.duplicate_rate,
+        null_rate=args.null_rate,
+        seed=args.seed
+    )
+    generator.generate(args.output, **split_rows(args.rows))
@@ -0,0 +1,45 @@
+import pandas as pd
+import logging
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+from datetime import datetime
+from typing import Optional
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+class WatermarkStore:
+    """High-water mark insert_on_dtm per source table, disimpan di table etl_watermark"""
+
+    def __init__(self, engine: Engine):
+        self.engine = engine
+
+    def get(self, source_name: str) -> Optional[datetime]:
+        with self.engine.connect() as conn:
+            value = conn.execute(
+                text("SELECT last_insert_on_dtm FROM etl_watermark WHERE source_name = :source_name"),
+                {'source_name': source_name}
+            ).scalar()
+
+        logger.info(f"Watermark for {source_name}: {value}")
+        return value
+
+    def update(self, source_name: str, value: Optional[datetime]):
+        if value is None or pd.isna(value):
+            logger.info(f"No new rows for {source_name}, watermark unchanged")
+            return
+
+        with self.engine.begin() as conn:
+            conn.execute(
+                text("""
+                    INSERT INTO etl_watermark (source_name, last_insert_on_dtm, updated_at)
+                    VALUES (:source_name, :value, CURRENT_TIMESTAMP)
+                    ON CONFLICT (source_name) DO UPDATE
+                    SET last_insert_on_dtm = GREATEST(etl_watermark.last_insert_on_dtm, EXCLUDED.last_insert_on_dtm),
+                        updated_at = CURRENT_TIMESTAMP
+                """),
+                {'source_name': source_name, 'value': pd.Timestamp(value).to_pydatetime()}
+            )
+
+        logger.info(f"Watermark for {source_name} advanced to {value}")
@@ -3,7 +3,7 @@ CREATE DATABASE transjakarta_dwh;
 \c transjakarta_dwh;
 
 CREATE TABLE IF NOT EXISTS dummy_transaksi_bus (
-    uuid VARCHAR(255) PRIMARY KEY,
+    uuid VARCHAR(255) NOT NULL,
     waktu_transaksi TIMESTAMP,
     armada_id_var VARCHAR(50),
     no_body_var VARCHAR(50),
@@ -19,10 +19,13 @@ CREATE TABLE IF NOT EXISTS dummy_transaksi_bus (
     status_var VARCHAR(10),
     free_service_boo BOOLEAN,
     insert_on_dtm TIMESTAMP
-);
+) PARTITION BY RANGE (waktu_transaksi);
+
+-- Partisi per bulan dibuat otomatis saat load (scripts/partitioning.py); default menampung waktu_transaksi NULL
+CREATE TABLE IF NOT EXISTS dummy_transaksi_bus_default PARTITION OF dummy_transaksi_bus DEFAULT;
 
 CREATE TABLE IF NOT EXISTS dummy_transaksi_halte (
-    uuid VARCHAR(255) PRIMARY KEY,
+    uuid VARCHAR(255) NOT NULL,
     waktu_transaksi TIMESTAMP,
     shelter_name_var VARCHAR(255),
     terminal_name_var VARCHAR(255),
@@ -38,7 +41,10 @@ CREATE TABLE IF NOT EXISTS dummy_transaksi_halte (
     status_var VARCHAR(10),
     free_service_boo BOOLEAN,
     insert_on_dtm TIMESTAMP
-);
+) PARTITION BY RANGE (waktu_transaksi);
+
+-- Partisi per bulan dibuat otomatis saat load (scripts/partitioning.py); default menampung waktu_transaksi NULL
+CREATE TABLE IF NOT EXISTS dummy_transaksi_halte_default PARTITION OF dummy_transaksi_halte DEFAULT;
 
 CREATE TABLE IF NOT EXISTS output_by_card_type (
     id SERIAL PRIMARY KEY,
@@ -71,12 +77,173 @@ CREATE TABLE IF NOT EXISTS output_by_tarif (
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
 );
 
-CREATE INDEX idx_transaksi_bus_waktu ON dummy_transaksi_bus (waktu_transaksi);
+CREATE TABLE IF NOT EXISTS output_by_corridor (
+    id SERIAL PRIMARY KEY,
+    tanggal DATE,
+    corridor_code VARCHAR(50),
+    corridor_name VARCHAR(255),
+    gate_in_boo BOOLEAN,
+    jumlah_pelanggan INTEGER,
+    total_amount BIGINT,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS output_by_hour (
+    id SERIAL PRIMARY KEY,
+    tanggal DATE,
+    jam SMALLINT,
+    gate_in_boo BOOLEAN,
+    jumlah_pelanggan INTEGER,
+    total_amount BIGINT,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Sel grid 0.01 derajat (geo_grid.GRID_CELL_DEGREES); titik tengah sel dihitung dari index untuk dashboard peta
+CREATE TABLE IF NOT EXISTS output_by_grid_cell (
+    id SERIAL PRIMARY KEY,
+    tanggal DATE,
+    lat_index INTEGER,
+    lon_index INTEGER,
+    gate_in_boo BOOLEAN,
+    jumlah_pelanggan INTEGER,
+    total_amount BIGINT,
+    cell_latitude DOUBLE PRECISION GENERATED ALWAYS AS ((lat_index + 0.5) * 0.01 - 90) STORED,
+    cell_longitude DOUBLE PRECISION GENERATED ALWAYS AS ((lon_index + 0.5) * 0.01 - 180) STORED,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
 
-CREATE INDEX idx_transaksi_halte_waktu ON dummy_transaksi_halte (waktu_transaksi);
+CREATE TABLE IF NOT EXISTS output_rollup_cube (
+    id SERIAL PRIMARY KEY,
+    tanggal DATE,
+    jam SMALLINT,
+    card_type VARCHAR(50),
+    tarif INTEGER,
+    route_code VARCHAR(50),
+    route_name VARCHAR(255),
+    shelter_name_var VARCHAR(255),
+    gate_in_boo BOOLEAN,
+    jumlah_pelanggan INTEGER,
+    total_amount BIGINT,
+    jumlah_pelanggan_route INTEGER,
+    total_amount_route BIGINT,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS ref_routes (
+    route_code VARCHAR(50),
+    route_name VARCHAR(255)
+);
+
+CREATE TABLE IF NOT EXISTS ref_realisasi_bus (
+    tanggal_realisasi DATE,
+    bus_body_no VARCHAR(50),
+    rute_realisasi VARCHAR(50)
+);
+
+CREATE TABLE IF NOT EXISTS ref_shelter_corridor (
+    shelter_name_var VARCHAR(255),
+    corridor_code VARCHAR(50),
+    corridor_name VARCHAR(255)
+);
+
+CREATE OR REPLACE FUNCTION standardize_no_body(no_body TEXT) RETURNS TEXT AS $$
+    -- Padanan DataTransformer.standardize_no_body: 3 huruf pertama - angka pertama (minimal 3 digit)
+    SELECT CASE
+        WHEN letter_part IS NOT NULL AND number_part IS NOT NULL
+            THEN left(letter_part, 3) || '-' || lpad(number_part, GREATEST(length(number_part), 3), '0')
+        ELSE normalized
+    END
+    FROM (
+        SELECT normalized,
+               substring(normalized FROM '[A-Z]+') AS letter_part,
+               substring(normalized FROM '[0-9]+') AS number_part
+        FROM (SELECT btrim(upper(no_body), E' \t\n\r\f\x0B') AS normalized) AS trimmed
+    ) AS parts;
+$$ LANGUAGE SQL IMMUTABLE;
+
+CREATE TABLE IF NOT EXISTS etl_watermark (
+    source_name VARCHAR(100) PRIMARY KEY,
+    last_insert_on_dtm TIMESTAMP,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+-- uuid yang sudah dihitung ke output, untuk membuang tap yang datang ulang di run berikutnya
+CREATE TABLE IF NOT EXISTS etl_processed_uuid (
+    uuid_hash UUID PRIMARY KEY,
+    waktu_transaksi TIMESTAMP NOT NULL,
+    processed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS pipeline_stage_metrics (
+    id SERIAL PRIMARY KEY,
+    run_id VARCHAR(250),
+    task_id VARCHAR(100),
+    stage VARCHAR(100) NOT NULL,
+    status VARCHAR(20) NOT NULL,
+    calls INTEGER,
+    started_at TIMESTAMP,
+    duration_sec NUMERIC(12, 3),
+    rows_in BIGINT,
+    rows_out BIGINT,
+    rows_per_sec NUMERIC(16, 1),
+    peak_rss_mb NUMERIC(12, 1),
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Unique index di table partisi wajib memuat kolom partisi, jadi hanya (uuid, waktu_transaksi) yang unik: uuid yang
+-- terkirim ulang dengan waktu_transaksi lain tetap masuk sebagai row terpisah dan baru dibuang saat transform
+-- (dedup uuid per run + etl_processed_uuid lintas run). Row dengan waktu_transaksi NULL tidak pernah bentrok di
+-- index ini; bulk load menghapus versi lamanya sebelum merge
+CREATE UNIQUE INDEX uq_transaksi_bus_uuid ON dummy_transaksi_bus (uuid, waktu_transaksi);
+
+CREATE UNIQUE INDEX uq_transaksi_halte_uuid ON dummy_transaksi_halte (uuid, waktu_transaksi);
+
+-- BRIN cukup kecil untuk kolom waktu yang berurutan sesuai urutan insert
+CREATE INDEX idx_transaksi_bus_waktu ON dummy_transaksi_bus USING brin (waktu_transaksi);
+
+CREATE INDEX idx_transaksi_halte_waktu ON dummy_transaksi_halte USING brin (waktu_transaksi);
+
+CREATE INDEX idx_transaksi_bus_insert_on ON dummy_transaksi_bus USING brin (insert_on_dtm);
+
+CREATE INDEX idx_transaksi_halte_insert_on ON dummy_transaksi_halte USING brin (insert_on_dtm);
+
+CREATE INDEX idx_ref_routes_code ON ref_routes (route_code);
+
+CREATE INDEX idx_ref_realisasi_key ON ref_realisasi_bus (tanggal_realisasi, bus_body_no);
+
+CREATE INDEX idx_ref_shelter_name ON ref_shelter_corridor (shelter_name_var);
 
 CREATE INDEX idx_output_card_tanggal ON output_by_card_type (tanggal);
 
 CREATE INDEX idx_output_route_tanggal ON output_by_route (tanggal);
 
-CREATE INDEX idx_output_tarif_tanggal ON output_by_tarif (tanggal);
\ No newline at end of file
+CREATE INDEX idx_output_tarif_tanggal ON output_by_tarif (tanggal);
+
+CREATE UNIQUE INDEX uq_output_card_key ON output_by_card_type (tanggal, card_type, gate_in_boo);
+
+CREATE UNIQUE INDEX uq_output_route_key ON output_by_route (tanggal, route_code, gate_in_boo);
+
+CREATE UNIQUE INDEX uq_output_tarif_key ON output_by_tarif (tanggal, tarif, gate_in_boo);
+
+CREATE INDEX idx_output_corridor_tanggal ON output_by_corridor (tanggal);
+
+CREATE UNIQUE INDEX uq_output_corridor_key ON output_by_corridor (tanggal, corridor_code, gate_in_boo);
+
+CREATE INDEX idx_output_hour_tanggal ON output_by_hour (tanggal);
+
+CREATE UNIQUE INDEX uq_output_hour_key ON output_by_hour (tanggal, jam, gate_in_boo);
+
+CREATE INDEX idx_output_grid_cell_tanggal ON output_by_grid_cell (tanggal);
+
+CREATE UNIQUE INDEX uq_output_grid_cell_key ON output_by_grid_cell (tanggal, lat_index, lon_index, gate_in_boo);
+
+CREATE INDEX idx_output_rollup_cube_tanggal ON output_rollup_cube (tanggal);
+
+CREATE UNIQUE INDEX uq_output_rollup_cube_key ON output_rollup_cube (
+    tanggal, jam, card_type, tarif, (COALESCE(route_code, '')), (COALESCE(route_name, '')),
+    (COALESCE(shelter_name_var, '')), gate_in_boo
+);
+
+CREATE INDEX idx_etl_processed_uuid_waktu ON etl_processed_uuid USING BRIN (waktu_transaksi);
+
+CREATE INDEX idx_pipeline_stage_metrics_run ON pipeline_stage_metrics (run_id, task_id);